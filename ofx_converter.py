@@ -7,8 +7,14 @@ Conversor modular com services separados
 
 import os
 import time
+import errno
+import atexit
+import queue
+import threading
 import shutil
 import logging
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Importar services
@@ -29,17 +35,106 @@ from services import (
     AccountMatcher
 )
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/app/logs/converter.log'),
-        logging.StreamHandler()
+class _DrainFlushMemoryHandler(MemoryHandler):
+    """
+    Acumula registros do arquivo de log enquanto a fila do listener tem
+    mais registros pendentes e grava o bloco de uma vez quando ela esvazia
+    (ou ao encher o buffer / chegar um WARNING)
+    """
+    
+    def __init__(self, log_queue: queue.SimpleQueue, target: logging.Handler):
+        super().__init__(capacity=512, flushLevel=logging.WARNING, target=target)
+        self.log_queue = log_queue
+    
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or self.log_queue.empty()
+
+
+# Configurar logging: quem loga so enfileira o registro; uma thread do
+# QueueListener formata e escreve no arquivo e no console
+def _setup_logging() -> QueueListener:
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler('/app/logs/converter.log')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    # Rajadas de log (um lote de arquivos) viram poucas escritas no arquivo
+    output_handlers = [
+        _DrainFlushMemoryHandler(log_queue, file_handler),
+        stream_handler
     ]
-)
+    queue_handler = QueueHandler(log_queue)
+    # Mensagem (com traceback) ja montada na origem; data/nivel no listener
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    
+    listener = QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    listener.start()
+    # Esvaziar a fila antes de sair
+    atexit.register(listener.stop)
+    return listener
+
+
+_log_listener = _setup_logging()
 logger = logging.getLogger(__name__)
 
+# Sistemas de arquivos de rede onde inotify nao entrega eventos confiaveis
+NETWORK_FS_TYPES = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'fuse.sshfs'}
+
+# Idade minima do mtime da pasta entrada para pular varreduras ociosas
+IDLE_MTIME_SETTLE_NS = 2_000_000_000
+
+
+class EntradaEventHandler:
+    """Recebe eventos do watchdog e enfileira arquivos prontos para conversao"""
+    
+    def __init__(self, pending: queue.Queue, entrada_dir: Path, file_validator: FileValidator):
+        """
+        Args:
+            pending: Fila consumida pelo loop de watch()
+            entrada_dir: Pasta monitorada (eventos de subpastas como lido/ sao ignorados)
+            file_validator: Validador usado para descartar arquivos nao suportados
+        """
+        self.pending = pending
+        self.entrada_dir = entrada_dir
+        self.file_validator = file_validator
+    
+    def dispatch(self, event):
+        """
+        Chamado pelo observer do watchdog para cada evento
+        
+        Apenas IN_CLOSE_WRITE (closed) e IN_MOVED_TO (moved) indicam que o
+        arquivo terminou de ser escrito na pasta entrada.
+        """
+        if event.is_directory:
+            return
+        
+        if event.event_type == 'closed':
+            path = event.src_path
+        elif event.event_type == 'moved':
+            path = event.dest_path
+        else:
+            return
+        
+        # Move para lido/ feito pelo proprio conversor gera 'moved' com destino vazio
+        if not path:
+            return
+        
+        file_path = Path(os.fsdecode(path))
+        if file_path.parent != self.entrada_dir:
+            return
+        
+        # Descartar temporarios/swap de editores antes de acordar o loop
+        if not (self.file_validator.is_valid_ofx_file(file_path)
+                or self.file_validator.is_valid_mercadopago_csv(file_path)
+                or self.file_validator.is_valid_rico_investimento_xlsx(file_path)):
+            return
+        
+        self.pending.put(file_path)
+
 
 class OFXConverter:
     """Conversor OFX para QIF usando arquitetura modular"""
@@ -54,6 +149,13 @@ class OFXConverter:
         for directory in [self.lido_dir, self.convertido_dir, self.logs_dir]:
             directory.mkdir(parents=True, exist_ok=True)
         
+        # Pastas mes-ano ja criadas no lote atual (ver create_month_folder)
+        self._month_folder_cache = {}
+        self._month_folder_lock = threading.Lock()
+        
+        # mtime da pasta entrada na ultima varredura sem nada a converter
+        self._idle_entrada_mtime_ns = None
+        
         # Inicializar services
         self.file_reader = OFXFileReader()
         self.date_extractor = DateExtractor()
@@ -106,6 +208,23 @@ class OFXConverter:
             config_file=str(contas_file) if contas_file.exists() else None
         )
         
+        # Roteamento tipo de arquivo (FileValidator.classify) -> conversor.
+        # A ordem da lista e a ordem de conversao/log no scan; a precedencia
+        # entre tipos (Rico antes de XP Conta, Mercado Pago como fallback de
+        # CSV) fica em FileValidator.classify.
+        self.routes = [
+            (FileValidator.OFX, self.convert_file, "OFX"),
+            (FileValidator.RICO_INVESTIMENTO_XLSX, self.convert_rico_investimento_file, "XLSX Rico Investimento"),
+            (FileValidator.RICO_CSV, self.convert_rico_file, "CSV da Rico"),
+            (FileValidator.XP_CC_CSV, self.convert_xp_cc_file, "CSV do XP CC"),
+            (FileValidator.XP_CONTA_CSV, self.convert_xp_conta_file, "CSV da XP Conta"),
+            (FileValidator.MERCADOPAGO_CSV, self.convert_mercadopago_file, "CSV do Mercado Pago"),
+        ]
+        self._routes_by_kind = {route[0]: route for route in self.routes}
+        
+        # Conversoes simultaneas por lote (CONVERTER_WORKERS=1 desliga o paralelismo)
+        self.max_workers = max(1, int(os.environ.get('CONVERTER_WORKERS', min(8, os.cpu_count() or 4))))
+        
         logger.info("OFX Converter v5.0 iniciado")
         logger.info(f"Monitorando pasta: {self.entrada_dir}")
         logger.info(f"Arquivos lidos organizados por mes em: {self.lido_dir}")
@@ -114,11 +233,88 @@ class OFXConverter:
         logger.info("Categorizacao automatica alinhada com ezBookkeeping")
     
     def create_month_folder(self, base_dir: Path, month_year: str) -> Path:
-        """Cria pasta para o mes-ano se nao existir"""
-        month_folder = base_dir / month_year
-        month_folder.mkdir(exist_ok=True)
+        """
+        Cria pasta para o mes-ano se nao existir
+        
+        Memoizado por (base_dir, mes-ano) durante um lote de conversao: arquivos
+        do mesmo mes nao repetem o mkdir. O cache e limpo a cada scan para
+        recriar pastas removidas pelo usuario entre lotes.
+        """
+        key = (base_dir, month_year)
+        with self._month_folder_lock:
+            month_folder = self._month_folder_cache.get(key)
+            if month_folder is None:
+                month_folder = base_dir / month_year
+                month_folder.mkdir(exist_ok=True)
+                self._month_folder_cache[key] = month_folder
         return month_folder
     
+    def _reset_month_folder_cache(self):
+        """Esquece pastas criadas no lote anterior"""
+        with self._month_folder_lock:
+            self._month_folder_cache.clear()
+    
+    def _move_to_lido(self, source: Path, lido_path: Path):
+        """
+        Move arquivo processado para a pasta lido
+        
+        entrada/ e entrada/lido/ ficam no mesmo filesystem, entao os.replace
+        e um unico rename(). shutil.move (copia + remove) so e usado se o
+        destino estiver em outro device (EXDEV).
+        """
+        try:
+            os.replace(source, lido_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(source), str(lido_path))
+    
+    def _emit_outputs(self, transactions, csv_path: Path, qif_path, account_name: str):
+        """
+        Escreve as saidas de uma conversao: CSV ezBookkeeping e, se pedido, QIF
+        
+        Os dois arquivos sao escritos na mesma passada sobre as transacoes.
+        
+        Args:
+            transactions: Lista de Transaction
+            csv_path: Path do CSV ezBookkeeping
+            qif_path: Path do QIF ou None para gerar apenas o CSV
+            account_name: Conta identificada pelo nome do arquivo ('' se nenhuma)
+        """
+        with EZBookkeepingCSVWriter() as csv_writer, QIFWriter() as qif_writer:
+            csv_writer.create_csv_file(csv_path)
+            if qif_path is not None:
+                qif_writer.create_qif_file(qif_path)
+            
+            # Linha CSV por tipo (tipos desconhecidos nao entram no CSV)
+            format_by_type = {
+                'transfer': csv_writer.format_transfer,
+                'expense': csv_writer.format_expense,
+                'income': csv_writer.format_income,
+            }
+            write_qif = qif_writer.write_transaction if qif_path is not None else None
+            
+            # Linhas CSV acumuladas e gravadas com um unico writerows()
+            csv_rows = []
+            for txn in transactions:
+                format_row = format_by_type.get(txn.type)
+                if format_row:
+                    csv_rows.append(format_row(
+                        txn.date,
+                        txn.amount,
+                        txn.description,
+                        txn.category,
+                        txn.subcategory,
+                        account_name
+                    ))
+                if write_qif:
+                    write_qif(txn.date, txn.amount, txn.description, txn.qif_category)
+            csv_writer.write_rows(csv_rows)
+        
+        logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
+        if qif_path is not None:
+            logger.info(f"QIF salvo em: {qif_path}")
+    
     def convert_file(self, ofx_file: Path) -> bool:
         """
         Converte um arquivo OFX para CSV ezBookkeeping + QIF
@@ -129,12 +325,13 @@ class OFXConverter:
         Returns:
             True se conversao bem-sucedida
         """
+        ofx_content = None
         try:
-            # Ler arquivo OFX
-            content = self.file_reader.read_with_encoding_detection(ofx_file)
+            # Mapear arquivo OFX (texto so e decodificado se o regex fallback rodar)
+            ofx_content = self.file_reader.open_mapped(ofx_file)
             
-            # Extrair mes-ano
-            month_year = self.date_extractor.extract_month_year_from_ofx(content)
+            # Extrair mes-ano direto dos bytes
+            month_year = self.date_extractor.extract_month_year_from_ofx_bytes(ofx_content.buffer)
             
             # Criar pastas para o mes-ano
             lido_month_folder = self.create_month_folder(self.lido_dir, month_year)
@@ -148,75 +345,20 @@ class OFXConverter:
             csv_path = convertido_month_folder / csv_filename
             qif_path = convertido_month_folder / qif_filename
             
-            # Converter - tentar com biblioteca ofxparse primeiro
             logger.info(f"Convertendo OFX: {ofx_file.name} -> {month_year}/{csv_filename} + {qif_filename}")
             
-            transactions = self.ofx_parser.parse_with_ofxparse(ofx_file)
-            
-            # Se falhar, usar regex (fallback)
-            if not transactions:
-                logger.info("Método biblioteca falhou, tentando metodo regex...")
-                transactions = self.ofx_parser.parse_with_regex(content)
+            transactions = self._parse_ofx(ofx_file, ofx_content)
             
             if transactions:
                 # Identificar conta pelo nome do arquivo
                 account_name = self.account_matcher.match_account(ofx_file.name) or ''
                 
-                # ====== ESCREVER CSV ======
-                csv_writer = EZBookkeepingCSVWriter()
-                csv_writer.create_csv_file(csv_path)
-                
-                for txn in transactions:
-                    if txn['type'] == 'transfer':
-                        csv_writer.write_transfer(
-                            txn['date'],
-                            txn['amount'],
-                            txn['description'],
-                            txn['category'],
-                            txn['subcategory'],
-                            account_name
-                        )
-                    elif txn['type'] == 'expense':
-                        csv_writer.write_expense(
-                            txn['date'],
-                            txn['amount'],
-                            txn['description'],
-                            txn['category'],
-                            txn['subcategory'],
-                            account_name
-                        )
-                    elif txn['type'] == 'income':
-                        csv_writer.write_income(
-                            txn['date'],
-                            txn['amount'],
-                            txn['description'],
-                            txn['category'],
-                            txn['subcategory'],
-                            account_name
-                        )
-
-                
-                csv_writer.close()
-                logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
-                
-                # ====== ESCREVER QIF ======
-                qif_writer = QIFWriter()
-                qif_writer.create_qif_file(qif_path)
-                
-                for txn in transactions:
-                    qif_writer.write_transaction(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['qif_category']
-                    )
-                
-                qif_writer.close()
-                logger.info(f"QIF salvo em: {qif_path}")
+                # ====== ESCREVER CSV + QIF ======
+                self._emit_outputs(transactions, csv_path, qif_path, account_name)
                 
                 # Mover arquivo para lido
                 lido_path = lido_month_folder / ofx_file.name
-                shutil.move(str(ofx_file), str(lido_path))
+                self._move_to_lido(ofx_file, lido_path)
                 
                 logger.info(f"Conversao bem-sucedida: {ofx_file.name}")
                 logger.info(f"Arquivo original movido para: {lido_path}")
@@ -229,6 +371,62 @@ class OFXConverter:
         except Exception as e:
             logger.error(f"Erro ao converter {ofx_file.name}: {e}")
             return False
+        finally:
+            if ofx_content:
+                ofx_content.close()
+    
+    def _parse_ofx(self, ofx_file: Path, ofx_content):
+        """
+        Executa a cadeia de parsers OFX: lxml (streaming), regex e, por
+        ultimo, ofxparse para arquivos com quirks
+        
+        O proximo parser so roda quando o anterior falha ou retorna zero
+        transacoes; contagem abaixo do numero de <STMTTRN> do arquivo gera
+        apenas um aviso, sem novo parse.
+        
+        Args:
+            ofx_file: Path do arquivo OFX
+            ofx_content: OFXContent mapeado do arquivo
+            
+        Returns:
+            Lista de transacoes ou None se todos os parsers falharem
+        """
+        parsers = [
+            ('lxml', lambda: self.ofx_parser.parse_with_lxml_iterparse(ofx_file, ofx_content.encoding)),
+            ('regex', lambda: self.ofx_parser.parse_with_regex(ofx_content.text)),
+            ('ofxparse', lambda: self.ofx_parser.parse_with_ofxparse(ofx_file)),
+        ]
+        
+        parse_attempts = []
+        transactions = None
+        
+        for name, parse in parsers:
+            started = time.perf_counter()
+            try:
+                transactions = parse()
+            except Exception as e:
+                logger.debug(f"Parser {name} falhou em {ofx_file.name}: {e}")
+                transactions = None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            parse_attempts.append((name, len(transactions or ()), elapsed_ms))
+            
+            if transactions:
+                break
+            logger.info(f"Método {name} nao retornou transacoes, tentando proximo...")
+        
+        logger.debug("Tentativas de parse: " + ", ".join(
+            f"{name}={count} ({elapsed_ms:.1f}ms)" for name, count, elapsed_ms in parse_attempts
+        ))
+        
+        if transactions:
+            expected_min = self.ofx_parser.count_declared_transactions(ofx_content.buffer)
+            if len(transactions) < expected_min:
+                logger.warning(
+                    f"{ofx_file.name}: parser {parse_attempts[-1][0]} retornou "
+                    f"{len(transactions)} de {expected_min} transacoes declaradas"
+                )
+        
+        return transactions
     
     def convert_mercadopago_file(self, csv_file: Path) -> bool:
         """
@@ -241,22 +439,22 @@ class OFXConverter:
             True se conversao bem-sucedida
         """
         try:
-            # Verificar se é CSV do Mercado Pago
-            if not MercadoPagoParser.is_mercadopago_csv(csv_file):
+            # Verificar e parsear CSV do Mercado Pago (arquivo lido uma vez)
+            logger.info(f"Convertendo CSV Mercado Pago: {csv_file.name}")
+            result = self.mercadopago_parser.parse(csv_file)
+            
+            if result is None:
                 logger.warning(f"Arquivo CSV não é do Mercado Pago: {csv_file.name}")
                 return False
             
-            # Parsear CSV
-            logger.info(f"Convertendo CSV Mercado Pago: {csv_file.name}")
-            transactions = self.mercadopago_parser.parse_csv(csv_file)
-            
+            transactions = result.transactions
             if not transactions:
                 logger.error(f"Falha ao parsear CSV: {csv_file.name}")
                 return False
             
             # Extrair mes-ano das transacoes
             month_year = self.date_extractor.extract_month_year_from_transactions(
-                [txn['date'] for txn in transactions]
+                txn.date for txn in transactions
             )
             
             # Criar pastas para o mes-ano
@@ -274,60 +472,12 @@ class OFXConverter:
             # Identificar conta pelo nome do arquivo
             account_name = self.account_matcher.match_account(csv_file.name) or ''
             
-            # ====== ESCREVER CSV ======
-            csv_writer = EZBookkeepingCSVWriter()
-            csv_writer.create_csv_file(csv_path)
-            
-            for txn in transactions:
-                if txn['type'] == 'transfer':
-                    csv_writer.write_transfer(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'expense':
-                    csv_writer.write_expense(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'income':
-                    csv_writer.write_income(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-            
-            csv_writer.close()
-            logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
-            
-            # ====== ESCREVER QIF ======
-            qif_writer = QIFWriter()
-            qif_writer.create_qif_file(qif_path)
-            
-            for txn in transactions:
-                qif_writer.write_transaction(
-                    txn['date'],
-                    txn['amount'],
-                    txn['description'],
-                    txn['qif_category']  # Usa categoria QIF (com [] para transferências)
-                )
-            
-            qif_writer.close()
-            logger.info(f"QIF salvo em: {qif_path}")
+            # ====== ESCREVER CSV + QIF ======
+            self._emit_outputs(transactions, csv_path, qif_path, account_name)
             
             # Mover arquivo para lido
             lido_path = lido_month_folder / csv_file.name
-            shutil.move(str(csv_file), str(lido_path))
+            self._move_to_lido(csv_file, lido_path)
             
             logger.info(f"Conversao bem-sucedida: {csv_file.name}")
             logger.info(f"Arquivo original movido para: {lido_path}")
@@ -359,7 +509,7 @@ class OFXConverter:
             
             # Extrair mes-ano das transacoes
             month_year = self.date_extractor.extract_month_year_from_transactions(
-                [txn['date'] for txn in transactions]
+                txn.date for txn in transactions
             )
             
             # Criar pastas para o mes-ano
@@ -377,60 +527,12 @@ class OFXConverter:
             # Identificar conta pelo nome do arquivo
             account_name = self.account_matcher.match_account(csv_file.name) or ''
             
-            # ====== ESCREVER CSV ======
-            csv_writer = EZBookkeepingCSVWriter()
-            csv_writer.create_csv_file(csv_path)
-            
-            for txn in transactions:
-                if txn['type'] == 'transfer':
-                    csv_writer.write_transfer(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'expense':
-                    csv_writer.write_expense(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'income':
-                    csv_writer.write_income(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-            
-            csv_writer.close()
-            logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
-            
-            # ====== ESCREVER QIF ======
-            qif_writer = QIFWriter()
-            qif_writer.create_qif_file(qif_path)
-            
-            for txn in transactions:
-                qif_writer.write_transaction(
-                    txn['date'],
-                    txn['amount'],
-                    txn['description'],
-                    txn['qif_category']
-                )
-            
-            qif_writer.close()
-            logger.info(f"QIF salvo em: {qif_path}")
+            # ====== ESCREVER CSV + QIF ======
+            self._emit_outputs(transactions, csv_path, qif_path, account_name)
             
             # Mover arquivo para lido
             lido_path = lido_month_folder / csv_file.name
-            shutil.move(str(csv_file), str(lido_path))
+            self._move_to_lido(csv_file, lido_path)
             
             logger.info(f"Conversao bem-sucedida: {csv_file.name}")
             logger.info(f"Arquivo original movido para: {lido_path}")
@@ -452,22 +554,22 @@ class OFXConverter:
             True se conversao bem-sucedida
         """
         try:
-            # Verificar se é CSV do XP CC
-            if not XPCCParser.is_xp_cc_csv(csv_file):
+            # Verificar e parsear CSV do XP CC (arquivo lido uma vez)
+            logger.info(f"Convertendo CSV XP CC: {csv_file.name}")
+            result = self.xp_cc_parser.parse(csv_file)
+            
+            if result is None:
                 logger.warning(f"Arquivo CSV não é do XP CC: {csv_file.name}")
                 return False
             
-            # Parsear CSV
-            logger.info(f"Convertendo CSV XP CC: {csv_file.name}")
-            transactions = self.xp_cc_parser.parse_csv(csv_file)
-            
+            transactions = result.transactions
             if not transactions:
                 logger.error(f"Falha ao parsear CSV XP CC: {csv_file.name}")
                 return False
             
             # Extrair mes-ano das transacoes
             month_year = self.date_extractor.extract_month_year_from_transactions(
-                [txn['date'] for txn in transactions]
+                txn.date for txn in transactions
             )
             
             # Criar pastas para o mes-ano
@@ -485,60 +587,12 @@ class OFXConverter:
             # Identificar conta pelo nome do arquivo
             account_name = self.account_matcher.match_account(csv_file.name) or ''
             
-            # ====== ESCREVER CSV ======
-            csv_writer = EZBookkeepingCSVWriter()
-            csv_writer.create_csv_file(csv_path)
-            
-            for txn in transactions:
-                if txn['type'] == 'transfer':
-                    csv_writer.write_transfer(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'expense':
-                    csv_writer.write_expense(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'income':
-                    csv_writer.write_income(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-            
-            csv_writer.close()
-            logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
-            
-            # ====== ESCREVER QIF ======
-            qif_writer = QIFWriter()
-            qif_writer.create_qif_file(qif_path)
-            
-            for txn in transactions:
-                qif_writer.write_transaction(
-                    txn['date'],
-                    txn['amount'],
-                    txn['description'],
-                    txn['qif_category']
-                )
-            
-            qif_writer.close()
-            logger.info(f"QIF salvo em: {qif_path}")
+            # ====== ESCREVER CSV + QIF ======
+            self._emit_outputs(transactions, csv_path, qif_path, account_name)
             
             # Mover arquivo para lido
             lido_path = lido_month_folder / csv_file.name
-            shutil.move(str(csv_file), str(lido_path))
+            self._move_to_lido(csv_file, lido_path)
             
             logger.info(f"Conversao bem-sucedida: {csv_file.name}")
             logger.info(f"Arquivo original movido para: {lido_path}")
@@ -560,12 +614,7 @@ class OFXConverter:
             True se conversao bem-sucedida
         """
         try:
-            # Verificar se é CSV da Conta XP
-            if not XPContaParser.is_xp_conta_csv(csv_file):
-                logger.warning(f"Arquivo CSV não é da Conta XP: {csv_file.name}")
-                return False
-            
-            # Parsear CSV
+            # Parsear CSV (parse_csv valida o cabeçalho da Conta XP)
             logger.info(f"Convertendo CSV XP Conta: {csv_file.name}")
             transactions = self.xp_conta_parser.parse_csv(csv_file)
             
@@ -575,7 +624,7 @@ class OFXConverter:
             
             # Extrair mes-ano das transacoes
             month_year = self.date_extractor.extract_month_year_from_transactions(
-                [txn['date'] for txn in transactions]
+                txn.date for txn in transactions
             )
             
             # Criar pastas para o mes-ano
@@ -592,44 +641,11 @@ class OFXConverter:
             account_name = self.account_matcher.match_account(csv_file.name) or ''
             
             # ====== ESCREVER CSV ======
-            csv_writer = EZBookkeepingCSVWriter()
-            csv_writer.create_csv_file(csv_path)
-            
-            for txn in transactions:
-                if txn['type'] == 'transfer':
-                    csv_writer.write_transfer(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'expense':
-                    csv_writer.write_expense(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'income':
-                    csv_writer.write_income(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-            
-            csv_writer.close()
-            logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
+            self._emit_outputs(transactions, csv_path, None, account_name)
             
             # Mover arquivo para lido
             lido_path = lido_month_folder / csv_file.name
-            shutil.move(str(csv_file), str(lido_path))
+            self._move_to_lido(csv_file, lido_path)
             
             logger.info(f"Conversao bem-sucedida: {csv_file.name}")
             logger.info(f"Arquivo original movido para: {lido_path}")
@@ -661,7 +677,7 @@ class OFXConverter:
             
             # Extrair mes-ano das transacoes
             month_year = self.date_extractor.extract_month_year_from_transactions(
-                [txn['date'] for txn in transactions]
+                txn.date for txn in transactions
             )
             
             # Criar pastas para o mes-ano
@@ -679,60 +695,12 @@ class OFXConverter:
             # Identificar conta pelo nome do arquivo
             account_name = self.account_matcher.match_account(xlsx_file.name) or ''
             
-            # ====== ESCREVER CSV ======
-            csv_writer = EZBookkeepingCSVWriter()
-            csv_writer.create_csv_file(csv_path)
-            
-            for txn in transactions:
-                if txn['type'] == 'transfer':
-                    csv_writer.write_transfer(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'expense':
-                    csv_writer.write_expense(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-                elif txn['type'] == 'income':
-                    csv_writer.write_income(
-                        txn['date'],
-                        txn['amount'],
-                        txn['description'],
-                        txn['category'],
-                        txn['subcategory'],
-                        account_name
-                    )
-            
-            csv_writer.close()
-            logger.info(f"CSV ezBookkeeping salvo em: {csv_path}")
-            
-            # ====== ESCREVER QIF ======
-            qif_writer = QIFWriter()
-            qif_writer.create_qif_file(qif_path)
-            
-            for txn in transactions:
-                qif_writer.write_transaction(
-                    txn['date'],
-                    txn['amount'],
-                    txn['description'],
-                    txn['qif_category']
-                )
-            
-            qif_writer.close()
-            logger.info(f"QIF salvo em: {qif_path}")
+            # ====== ESCREVER CSV + QIF ======
+            self._emit_outputs(transactions, csv_path, qif_path, account_name)
             
             # Mover arquivo para lido
             lido_path = lido_month_folder / xlsx_file.name
-            shutil.move(str(xlsx_file), str(lido_path))
+            self._move_to_lido(xlsx_file, lido_path)
             
             logger.info(f"Conversao bem-sucedida: {xlsx_file.name}")
             logger.info(f"Arquivo original movido para: {lido_path}")
@@ -743,84 +711,283 @@ class OFXConverter:
             logger.error(f"Erro ao converter XLSX Rico Investimento {xlsx_file.name}: {e}")
             return False
 
-    def scan_and_convert(self):
-        """Escaneia pasta entrada e converte arquivos OFX, CSV do Mercado Pago e Rico"""
-        # Arquivos OFX
-        ofx_files = [f for f in self.entrada_dir.iterdir() 
-                     if f.is_file() and self.file_validator.is_valid_ofx_file(f)]
-        
-        # Arquivos XLSX de investimentos da Rico
-        rico_xlsx_files = [f for f in self.entrada_dir.iterdir()
-                           if f.is_file() and self.file_validator.is_valid_rico_investimento_xlsx(f)]
-        
-        # Arquivos CSV da Rico (tem "rico" no nome)
-        rico_files = [f for f in self.entrada_dir.iterdir()
-                      if f.is_file() and self.file_validator.is_valid_rico_csv(f)]
-        
-        # Arquivos CSV do XP CC (tem cabeçalho específico)
-        xp_cc_files = [f for f in self.entrada_dir.iterdir()
-                       if f.is_file() and self.file_validator.is_valid_xp_cc_csv(f)]
-        
-        # Arquivos CSV da Conta Digital XP (tem cabeçalho específico)
-        xp_conta_files = [f for f in self.entrada_dir.iterdir()
-                         if f.is_file() and self.file_validator.is_valid_xp_conta_csv(f)]
-        
-        # Arquivos CSV do Mercado Pago (CSV que NÃO é da Rico, XP CC ou XP Conta)
-        csv_files = [f for f in self.entrada_dir.iterdir() 
-                     if f.is_file() and self.file_validator.is_valid_mercadopago_csv(f)
-                     and not self.file_validator.is_valid_rico_csv(f)
-                     and not self.file_validator.is_valid_xp_cc_csv(f)
-                     and not self.file_validator.is_valid_xp_conta_csv(f)]
-        
-        if ofx_files:
-            logger.info(f"Encontrados {len(ofx_files)} arquivo(s) OFX para converter")
-            for ofx_file in ofx_files:
-                self.convert_file(ofx_file)
-        
-        if rico_xlsx_files:
-            logger.info(f"Encontrados {len(rico_xlsx_files)} arquivo(s) XLSX Rico Investimento para converter")
-            for rico_xlsx_file in rico_xlsx_files:
-                self.convert_rico_investimento_file(rico_xlsx_file)
-        
-        if rico_files:
-            logger.info(f"Encontrados {len(rico_files)} arquivo(s) CSV da Rico para converter")
-            for rico_file in rico_files:
-                self.convert_rico_file(rico_file)
-        
-        if xp_cc_files:
-            logger.info(f"Encontrados {len(xp_cc_files)} arquivo(s) CSV do XP CC para converter")
-            for xp_cc_file in xp_cc_files:
-                self.convert_xp_cc_file(xp_cc_file)
-        
-        if xp_conta_files:
-            logger.info(f"Encontrados {len(xp_conta_files)} arquivo(s) CSV da XP Conta para converter")
-            for xp_conta_file in xp_conta_files:
-                self.convert_xp_conta_file(xp_conta_file)
-        
-        if csv_files:
-            logger.info(f"Encontrados {len(csv_files)} arquivo(s) CSV do Mercado Pago para converter")
-            for csv_file in csv_files:
-                self.convert_mercadopago_file(csv_file)
+    def scan_and_convert(self) -> int:
+        """
+        Escaneia pasta entrada e converte arquivos OFX, CSV do Mercado Pago, Rico e XP
+        
+        Returns:
+            Quantidade de arquivos convertidos com sucesso
+        """
+        # Pasta sem entradas novas desde a ultima varredura ociosa: nada a fazer
+        try:
+            entrada_mtime_ns = os.stat(self.entrada_dir).st_mtime_ns
+        except OSError:
+            entrada_mtime_ns = None
+        if entrada_mtime_ns is not None and entrada_mtime_ns == self._idle_entrada_mtime_ns:
+            return 0
+        
+        self._reset_month_folder_cache()
+        
+        # Uma unica passada: scandir ja traz o tipo da entrada (sem stat extra)
+        # e cada arquivo e classificado uma vez
+        found = {}
+        with os.scandir(self.entrada_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                file_path = Path(entry.path)
+                route = self._route(file_path)
+                if route:
+                    found.setdefault(route, []).append(file_path)
+        
+        # So memoriza o mtime se nao ha nada pendente (arquivos que falharam
+        # continuam sendo tentados) e se a ultima alteracao nao e tao recente
+        # que outra criacao caberia no mesmo tick do mtime
+        if (not found and entrada_mtime_ns is not None
+                and time.time_ns() - entrada_mtime_ns > IDLE_MTIME_SETTLE_NS):
+            self._idle_entrada_mtime_ns = entrada_mtime_ns
+        else:
+            self._idle_entrada_mtime_ns = None
+        
+        jobs = []
+        for route in self.routes:
+            files = found.get(route)
+            if files:
+                _, convert, label = route
+                logger.info(f"Encontrados {len(files)} arquivo(s) {label} para converter")
+                jobs.extend((convert, f) for f in files)
+        
+        return self._run_jobs(jobs)
     
-    def watch(self):
-        """Loop principal de monitoramento"""
-        watch_interval = int(os.environ.get('WATCH_INTERVAL', 5))
+    def _route(self, file_path: Path):
+        """
+        Encontra a rota de conversao de um arquivo
+        
+        Args:
+            file_path: Path do arquivo
+            
+        Returns:
+            Tupla (tipo, metodo convert_*, rotulo) ou None se nao suportado
+        """
+        return self._routes_by_kind.get(self.file_validator.classify(file_path))
+    
+    def _run_jobs(self, jobs: list) -> int:
+        """
+        Executa conversoes em paralelo (I/O-bound: leitura, escrita, move)
+        
+        As saidas dependem so do stem do arquivo (convertido/<mes>/<stem>.csv
+        e .qif), entao arquivos com o mesmo stem (ex.: x.ofx e x.csv) rodam
+        em serie, na ordem original, em vez de escreverem o mesmo destino ao
+        mesmo tempo; como antes, a ultima conversao prevalece.
+        
+        Args:
+            jobs: Lista de tuplas (metodo convert_*, Path do arquivo)
+            
+        Returns:
+            Quantidade de arquivos convertidos com sucesso
+        """
+        if not jobs:
+            return 0
+        
+        groups = {}
+        for convert, file_path in jobs:
+            groups.setdefault(file_path.stem, []).append((convert, file_path))
+        
+        # Um unico grupo nao compensa o overhead do executor
+        if len(groups) == 1:
+            return self._run_serial(jobs)
+        
+        max_workers = min(self.max_workers, len(groups))
+        converted = 0
         
-        logger.info(f"Iniciando monitoramento v3.0 (intervalo: {watch_interval}s)")
-        logger.info("Novo: Arquivos organizados automaticamente por mes-ano")
-        logger.info("Suporte a CSV do Mercado Pago com deteccao de transferencias Pix")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._run_serial, group) for group in groups.values()]
+            for future in as_completed(futures):
+                converted += future.result()
         
+        return converted
+    
+    def _run_serial(self, jobs: list) -> int:
+        """
+        Executa conversoes uma apos a outra
+        
+        Args:
+            jobs: Lista de tuplas (metodo convert_*, Path do arquivo)
+            
+        Returns:
+            Quantidade de arquivos convertidos com sucesso
+        """
+        converted = 0
+        for convert, file_path in jobs:
+            try:
+                if convert(file_path):
+                    converted += 1
+            except Exception as e:
+                logger.error(f"Erro ao converter {file_path.name}: {e}")
+        return converted
+    
+    def process_file(self, file_path: Path) -> bool:
+        """
+        Converte um unico arquivo, escolhendo o conversor pelo tipo detectado
+        
+        Args:
+            file_path: Path do arquivo na pasta entrada
+            
+        Returns:
+            True se conversao bem-sucedida
+        """
+        route = self._route(file_path)
+        if route:
+            self._reset_month_folder_cache()
+            return route[1](file_path)
+        
+        logger.debug(f"Arquivo ignorado (formato nao suportado): {file_path.name}")
+        return False
+    
+    def _is_network_mount(self, directory: Path) -> bool:
+        """
+        Verifica se a pasta esta em um mount de rede (NFS/CIFS)
+        
+        Args:
+            directory: Pasta a verificar
+            
+        Returns:
+            True se o mount mais especifico da pasta for de rede
+        """
+        try:
+            with open('/proc/mounts', 'r', encoding='utf-8') as f:
+                mounts = [line.split() for line in f]
+        except OSError:
+            return False
+        
+        target = str(directory.resolve())
+        best_mount, best_fstype = '', ''
+        
+        for fields in mounts:
+            if len(fields) < 3:
+                continue
+            # /proc/mounts escapa espacos como \040
+            mount_point = fields[1].replace('\\040', ' ')
+            prefix = mount_point.rstrip('/') + '/'
+            if target == mount_point or target.startswith(prefix):
+                if len(mount_point) > len(best_mount):
+                    best_mount, best_fstype = mount_point, fields[2]
+        
+        return best_fstype in NETWORK_FS_TYPES
+    
+    def _create_observer(self, pending: queue.Queue):
+        """
+        Cria observer inotify para a pasta entrada
+        
+        Args:
+            pending: Fila onde os arquivos novos serao enfileirados
+            
+        Returns:
+            Observer configurado ou None se for necessario usar polling
+        """
+        try:
+            from watchdog.events import FileClosedEvent, FileMovedEvent
+            from watchdog.observers.api import BaseObserver
+            from watchdog.observers.inotify import InotifyFullEmitter
+        except ImportError:
+            logger.warning("watchdog/inotify indisponivel, usando polling")
+            return None
+        
+        if self._is_network_mount(self.entrada_dir):
+            logger.warning(f"{self.entrada_dir} esta em mount de rede, usando polling")
+            return None
+        
+        # InotifyFullEmitter reporta IN_MOVED_TO vindo de fora da pasta como
+        # evento 'moved' (e nao 'created'), permitindo ignorar IN_CREATE.
+        # event_filter restringe a mascara inotify a IN_CLOSE_WRITE | IN_MOVE,
+        # sem IN_OPEN/IN_ACCESS/IN_MODIFY. Watch nao recursivo: lido/ fica de fora.
+        handler = EntradaEventHandler(pending, self.entrada_dir, self.file_validator)
+        observer = BaseObserver(emitter_class=InotifyFullEmitter)
+        observer.schedule(
+            handler,
+            str(self.entrada_dir),
+            recursive=False,
+            event_filter=[FileClosedEvent, FileMovedEvent]
+        )
+        return observer
+    
+    def _watch_polling(self, interval_min: int, interval_max: int):
+        """
+        Loop de monitoramento por polling (fallback sem inotify)
+        
+        O intervalo volta ao mínimo sempre que uma varredura converte algum
+        arquivo e dobra a cada varredura ociosa, até o máximo.
+        
+        Args:
+            interval_min: Intervalo em segundos enquanto chegam arquivos
+            interval_max: Intervalo máximo em segundos quando ocioso
+        """
+        logger.info(f"Monitoramento por polling (intervalo: {interval_min}s a {interval_max}s)")
+        
+        interval = interval_min
         while True:
             try:
-                self.scan_and_convert()
-                time.sleep(watch_interval)
+                if self.scan_and_convert():
+                    interval = interval_min
+                time.sleep(interval)
+                interval = min(interval * 2, interval_max)
             except KeyboardInterrupt:
                 logger.info("Monitoramento interrompido")
                 break
             except Exception as e:
                 logger.error(f"Erro no monitoramento: {e}")
-                time.sleep(watch_interval)
-
+                time.sleep(interval)
+    
+    def watch(self):
+        """Loop principal de monitoramento"""
+        watch_interval = int(os.environ.get('WATCH_INTERVAL', 5))
+        watch_interval_min = max(1, int(os.environ.get('WATCH_INTERVAL_MIN', watch_interval)))
+        watch_interval_max = max(watch_interval_min, int(os.environ.get('WATCH_INTERVAL_MAX', 60)))
+        
+        logger.info("Iniciando monitoramento v5.0")
+        logger.info("Arquivos organizados automaticamente por mes-ano")
+        
+        pending = queue.Queue()
+        observer = self._create_observer(pending)
+        
+        if observer is None:
+            self._watch_polling(watch_interval_min, watch_interval_max)
+            return
+        
+        observer.start()
+        logger.info(f"Monitoramento por eventos inotify em: {self.entrada_dir}")
+        
+        # Converter arquivos que chegaram antes do observer iniciar
+        self.scan_and_convert()
+        
+        try:
+            while observer.is_alive():
+                try:
+                    file_path = pending.get(timeout=watch_interval)
+                except queue.Empty:
+                    file_path = None
+                
+                try:
+                    if file_path is None:
+                        # Sem eventos: varrer como no polling para repetir arquivos
+                        # que falharam e pegar os de montagens sem inotify (9p,
+                        # virtiofs, grpcfuse). Pasta ociosa custa so um stat
+                        self.scan_and_convert()
+                    elif file_path.is_file():
+                        # Arquivo pode ja ter sido convertido por uma varredura
+                        self.process_file(file_path)
+                except Exception as e:
+                    logger.error(f"Erro no monitoramento: {e}")
+        except KeyboardInterrupt:
+            logger.info("Monitoramento interrompido")
+            return
+        finally:
+            observer.stop()
+            observer.join()
+        
+        # Observer morreu (ex: pasta entrada removida): seguir com polling
+        logger.warning("Observer inotify encerrado, usando polling")
+        self._watch_polling(watch_interval_min, watch_interval_max)
 
 if __name__ == '__main__':
     converter = OFXConverter()
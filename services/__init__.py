@@ -19,6 +19,7 @@ from services.rico_investimento_parser import RicoInvestimentoParser
 from services.xp_cc_parser import XPCCParser
 from services.xp_conta_parser import XPContaParser
 from services.account_matcher import AccountMatcher
+from services.transaction import Transaction
 
 
 __all__ = [
@@ -35,7 +36,8 @@ __all__ = [
     'RicoInvestimentoParser',
     'XPCCParser',
     'XPContaParser',
-    'AccountMatcher'
+    'AccountMatcher',
+    'Transaction'
 ]
 
 __version__ = '3.0.0'
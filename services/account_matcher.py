@@ -7,10 +7,13 @@ Responsável por identificar a conta baseada no nome do arquivo
 
 import logging
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Separadores do nome do arquivo trocados por espaço antes do matching
+_FILENAME_SEPARATORS = str.maketrans('_-.', '   ')
+
 
 class AccountMatcher:
     """Identifica conta do ezBookkeeping baseado em palavras-chave no nome do arquivo"""
@@ -23,6 +26,9 @@ class AccountMatcher:
             config_file: Caminho para arquivo YAML de configuração de contas
         """
         self.accounts: List[Dict] = []
+        # Índice invertido: palavra-chave -> [(índice da conta, grupo)], para
+        # testar cada palavra distinta uma única vez por nome de arquivo
+        self._keyword_index: Dict[str, List[Tuple[int, str]]] = {}
         
         if config_file and Path(config_file).exists():
             self.load_config(config_file)
@@ -37,14 +43,16 @@ class AccountMatcher:
         try:
             import yaml
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            # Loader em C (libyaml) quando o PyYAML foi compilado com ele
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(file_path, 'rb') as f:
+                config = yaml.load(f, Loader=loader)
             
             # Carregar todas as categorias de contas
             for categoria in ['contas_correntes', 'cartoes_credito', 'contas_virtuais', 'contas_investimento']:
                 if categoria in config:
                     for account in config[categoria]:
-                        self.accounts.append({
+                        self._append_account({
                             'conta': account['conta'],
                             'titular': [t.lower() for t in account.get('titular', [])],
                             'banco': [b.lower() for b in account.get('banco', [])],
@@ -77,20 +85,30 @@ class AccountMatcher:
         filename_clean = Path(filename).stem.lower()
         
         # Substituir separadores por espaços para facilitar matching
-        filename_normalized = filename_clean.replace('_', ' ').replace('-', ' ').replace('.', ' ')
+        filename_normalized = filename_clean.translate(_FILENAME_SEPARATORS)
         
         logger.debug(f"Matching arquivo: '{filename}' -> '{filename_normalized}'")
         
+        # Grupos (titular/banco/tipo) com pelo menos uma palavra-chave no nome,
+        # por conta; cada palavra distinta é buscada uma vez só
+        groups_by_account: Dict[int, set] = {}
+        for keyword, postings in self._keyword_index.items():
+            if keyword in filename_normalized:
+                for account_idx, group in postings:
+                    groups_by_account.setdefault(account_idx, set()).add(group)
+        
         matches = []
         
-        for account in self.accounts:
-            # Verificar se encontra pelo menos uma palavra-chave de cada categoria presente
-            titular_match = self._has_keyword_match(filename_normalized, account['titular'])
-            banco_match = self._has_keyword_match(filename_normalized, account['banco'])
-            tipo_match = self._has_keyword_match(filename_normalized, account['tipo'])
+        # Ordem das contas preservada: desempate igual ao da configuração
+        for account_idx in sorted(groups_by_account):
+            account = self.accounts[account_idx]
+            groups = groups_by_account[account_idx]
+            titular_match = 'titular' in groups
+            banco_match = 'banco' in groups
+            tipo_match = 'tipo' in groups
             
             # Score: quantas categorias tiveram match
-            score = sum([titular_match, banco_match, tipo_match])
+            score = len(groups)
             
             # Só considera se tiver match em pelo menos 2 categorias (banco + titular ou banco + tipo)
             if score >= 2:
@@ -109,30 +127,12 @@ class AccountMatcher:
             logger.info(f"  Palavras no arquivo: {filename_normalized}")
             return None
         
-        # Ordenar por score (maior primeiro), depois por prioridade (maior primeiro)
-        matches.sort(key=lambda x: (x['score'], x['prioridade']), reverse=True)
-        
-        best_match = matches[0]
+        # Maior score, depois maior prioridade; empate fica com a primeira da configuração
+        best_match = max(matches, key=lambda x: (x['score'], x['prioridade']))
         logger.info(f"Conta selecionada para '{filename}': {best_match['conta']}")
         
         return best_match['conta']
     
-    def _has_keyword_match(self, text: str, keywords: List[str]) -> bool:
-        """
-        Verifica se alguma palavra-chave está presente no texto
-        
-        Args:
-            text: Texto para buscar (já em lowercase)
-            keywords: Lista de palavras-chave (já em lowercase)
-            
-        Returns:
-            True se encontrou pelo menos uma palavra-chave
-        """
-        for keyword in keywords:
-            if keyword in text:
-                return True
-        return False
-    
     def add_account(self, conta: str, titular: List[str], banco: List[str], 
                    tipo: List[str], prioridade: int = 0):
         """
@@ -145,7 +145,7 @@ class AccountMatcher:
             tipo: Lista de palavras-chave do tipo
             prioridade: Prioridade para desempate
         """
-        self.accounts.append({
+        self._append_account({
             'conta': conta,
             'titular': [t.lower() for t in titular],
             'banco': [b.lower() for b in banco],
@@ -153,3 +153,16 @@ class AccountMatcher:
             'prioridade': prioridade
         })
         logger.info(f"Conta adicionada: {conta}")
+    
+    def _append_account(self, account: Dict):
+        """
+        Registra uma conta e indexa suas palavras-chave
+        
+        Args:
+            account: Dict com conta, titular, banco, tipo e prioridade
+        """
+        account_idx = len(self.accounts)
+        self.accounts.append(account)
+        for group in ('titular', 'banco', 'tipo'):
+            for keyword in account[group]:
+                self._keyword_index.setdefault(keyword, []).append((account_idx, group))
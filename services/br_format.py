@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BR Format
+Conversões de formatos brasileiros compartilhadas pelos parsers CSV
+"""
+
+from datetime import date
+from typing import Optional
+
+# Valor BR -> formato do float() numa única passada: descarta "R$", espaços e
+# pontos de milhar e troca a vírgula decimal; o sinal fica como prefixo
+BR_AMOUNT_TABLE = str.maketrans({
+    'R': None, '$': None, ' ': None, '\xa0': None, '.': None, ',': '.'
+})
+
+# Número BR -> formato do float(): remove pontos de milhar e troca a vírgula decimal
+BR_NUMBER_TABLE = str.maketrans({'.': '', ',': '.'})
+
+
+def fast_convert_date(date_str: str) -> Optional[str]:
+    """
+    Reordena "DD/MM/YYYY" em "YYYY-MM-DD 00:00:00" sem strptime/strftime
+    
+    O datetime nunca é usado além da formatação: basta fatiar os campos.
+    date() só confere o calendário (31/02 continua inválido).
+    
+    Args:
+        date_str: Data no formato DD/MM/YYYY
+        
+    Returns:
+        Data no formato YYYY-MM-DD 00:00:00 ou None se fora do layout fixo
+        
+    Raises:
+        ValueError: Dia/mês fora do calendário
+    """
+    if len(date_str) != 10 or date_str[2] != '/' or date_str[5] != '/':
+        return None
+    day, month, year = date_str[0:2], date_str[3:5], date_str[6:10]
+    digits = day + month + year
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    date(int(year), int(month), int(day))
+    return f"{year}-{month}-{day} 00:00:00"
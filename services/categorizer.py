@@ -5,12 +5,45 @@ Transaction Categorizer Service
 Responsável por categorizar transações baseado em regras
 """
 
+import re
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Pattern, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Descrições memorizadas por lista de regras antes de o cache ser descartado
+RULE_CACHE_SIZE = 4096
+
+# Marca de ausência no cache de regras (None é um resultado válido)
+_MISSING = object()
+
+
+def _compile_keyword_matcher(rules: List[Dict]) -> Optional[Tuple[Pattern, Dict[str, int]]]:
+    """
+    Compila todas as palavras-chave de uma lista de regras em uma única regex
+    
+    O lookahead faz o finditer testar cada posição da descrição, inclusive
+    palavras sobrepostas; as alternativas seguem a ordem das regras, então
+    em cada posição vence a palavra da regra mais antiga.
+    
+    Args:
+        rules: Lista de dicts com {keywords, category, subcategory}
+        
+    Returns:
+        (regex, índice da primeira regra por palavra) ou None se não há palavras
+    """
+    rule_index_by_keyword = {}
+    for index, rule in enumerate(rules):
+        for keyword in rule['keywords']:
+            rule_index_by_keyword.setdefault(keyword, index)
+    
+    if not rule_index_by_keyword:
+        return None
+    
+    alternation = '|'.join(re.escape(keyword) for keyword in rule_index_by_keyword)
+    return re.compile(f'(?=({alternation}))'), rule_index_by_keyword
+
 
 class TransactionCategorizer:
     """Categoriza transações baseado em palavras-chave"""
@@ -26,6 +59,12 @@ class TransactionCategorizer:
         self.expense_rules = []  # Lista de dicts com {keywords, category, subcategory}
         self.transfer_rules = []  # Lista de dicts com {keywords, category, subcategory}
         
+        # Regex compilada por lista de regras (invalidada em add_*_rule)
+        self._matchers = {}
+        # Regra encontrada por descrição, por lista de regras: extratos
+        # repetem muito as mesmas descrições (PIX, IOF, mesmo comerciante)
+        self._rule_cache = {}
+        
         if rules_file and Path(rules_file).exists():
             self.load_rules_from_file(rules_file)
     
@@ -49,30 +88,25 @@ class TransactionCategorizer:
         """
         description_lower = description.lower()
         
-        # DEBUG: Log transfer rules
-        logger.debug(f"categorize_smart: description='{description}', amount={amount}")
-        logger.debug(f"categorize_smart: transfer_rules count={len(self.transfer_rules)}")
-        
         # 1. Primeiro verifica se é transferência (via YAML transferencias)
-        for rule in self.transfer_rules:
-            logger.debug(f"Checking transfer rule: {rule['category']} - keywords: {rule['keywords']}")
-            if any(keyword in description_lower for keyword in rule['keywords']):
-                logger.info(f"MATCHED TRANSFER: {description} -> {rule['category']}")
-                return {
-                    'type': 'transfer',
-                    'category': rule['category'],
-                    'subcategory': rule['subcategory']
-                }
+        rule = self._find_rule('transfer', self.transfer_rules, description_lower)
+        if rule:
+            logger.info(f"MATCHED TRANSFER: {description} -> {rule['category']}")
+            return {
+                'type': 'transfer',
+                'category': rule['category'],
+                'subcategory': rule['subcategory']
+            }
         
         # 2. Se não for transferência, categoriza como receita/despesa
         if amount > 0:
-            for rule in self.income_rules:
-                if any(keyword in description_lower for keyword in rule['keywords']):
-                    return {
-                        'type': 'income',
-                        'category': rule['category'],
-                        'subcategory': rule.get('subcategory', '')
-                    }
+            rule = self._find_rule('income', self.income_rules, description_lower)
+            if rule:
+                return {
+                    'type': 'income',
+                    'category': rule['category'],
+                    'subcategory': rule.get('subcategory', '')
+                }
             # Fallback
             return {
                 'type': 'income',
@@ -80,13 +114,13 @@ class TransactionCategorizer:
                 'subcategory': 'Outras Receitas'
             }
         else:
-            for rule in self.expense_rules:
-                if any(keyword in description_lower for keyword in rule['keywords']):
-                    return {
-                        'type': 'expense',
-                        'category': rule['category'],
-                        'subcategory': rule.get('subcategory', '')
-                    }
+            rule = self._find_rule('expense', self.expense_rules, description_lower)
+            if rule:
+                return {
+                    'type': 'expense',
+                    'category': rule['category'],
+                    'subcategory': rule.get('subcategory', '')
+                }
             # Fallback
             return {
                 'type': 'expense',
@@ -94,11 +128,68 @@ class TransactionCategorizer:
                 'subcategory': 'Outras Despesas'
             }
     
-    def _deprecated_categorize(self, description: str, amount: float, trn_type: str = None) -> str:
+    def find_rule(self, kind: str, description_lower: str) -> Optional[Dict]:
         """
-        DEPRECATED: Use categorize_smart() instead
+        Primeira regra de um tipo que casa com a descrição (sem fallback)
+        
+        Para parsers com regras próprias de tipo/fallback (ex: XP CC), usando
+        o mesmo matcher compilado e cache de categorize_smart.
+        
+        Args:
+            kind: 'transfer', 'income' ou 'expense'
+            description_lower: Descrição em minúsculas
+            
+        Returns:
+            Dict da regra ({keywords, category, subcategory}) ou None
         """
-        raise DeprecationWarning("Use categorize_smart() instead of categorize()")
+        rules_by_kind = {
+            'transfer': self.transfer_rules,
+            'income': self.income_rules,
+            'expense': self.expense_rules,
+        }
+        return self._find_rule(kind, rules_by_kind[kind], description_lower)
+    
+    def _find_rule(self, kind: str, rules: List[Dict], description_lower: str) -> Optional[Dict]:
+        """
+        Retorna a primeira regra (na ordem do YAML) com alguma palavra-chave
+        contida na descrição, com uma única varredura da descrição
+        
+        Args:
+            kind: 'transfer', 'income' ou 'expense' (chave do cache de regex)
+            rules: Lista de regras do tipo
+            description_lower: Descrição em minúsculas
+            
+        Returns:
+            Dict da regra ou None se nenhuma casar
+        """
+        cache = self._rule_cache.setdefault(kind, {})
+        # Uma única leitura: outra thread do lote pode limpar o cache entre
+        # um teste "in" e o acesso por chave
+        rule = cache.get(description_lower, _MISSING)
+        if rule is not _MISSING:
+            return rule
+        
+        if kind not in self._matchers:
+            self._matchers[kind] = _compile_keyword_matcher(rules)
+        
+        matcher = self._matchers[kind]
+        rule = None
+        if matcher is not None:
+            pattern, rule_index_by_keyword = matcher
+            best = None
+            for match in pattern.finditer(description_lower):
+                index = rule_index_by_keyword[match.group(1)]
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+            if best is not None:
+                rule = rules[best]
+        
+        if len(cache) >= RULE_CACHE_SIZE:
+            cache.clear()
+        cache[description_lower] = rule
+        return rule
     
     def add_income_rule(self, category: str, subcategory: str, keywords: List[str]):
         """Adiciona regra de receita"""
@@ -107,13 +198,10 @@ class TransactionCategorizer:
             'subcategory': subcategory,
             'keywords': keywords
         })
+        self._matchers.pop('income', None)
+        self._rule_cache.pop('income', None)
         logger.info(f"Regra de receita adicionada: {category} > {subcategory}")
     
-    def _deprecated_add_income_rule_old(self, category: str, keywords: List[str]):
-        """DEPRECATED"""
-        if category in {}:
-            pass
-    
     def add_expense_rule(self, category: str, subcategory: str, keywords: List[str]):
         """Adiciona regra de despesa"""
         self.expense_rules.append({
@@ -121,12 +209,10 @@ class TransactionCategorizer:
             'subcategory': subcategory,
             'keywords': keywords
         })
+        self._matchers.pop('expense', None)
+        self._rule_cache.pop('expense', None)
         logger.info(f"Regra de despesa adicionada: {category} > {subcategory}")
     
-    def _deprecated_add_expense_rule_old(self, category: str, keywords: List[str]):
-        """DEPRECATED"""
-        pass
-    
     def add_transfer_rule(self, category: str, subcategory: str, keywords: List[str]):
         """Adiciona regra de transferência"""
         self.transfer_rules.append({
@@ -134,14 +220,10 @@ class TransactionCategorizer:
             'subcategory': subcategory,
             'keywords': keywords
         })
+        self._matchers.pop('transfer', None)
+        self._rule_cache.pop('transfer', None)
         logger.info(f"Regra de transferência adicionada: {category} > {subcategory}")
     
-    def _deprecated_categorize_transfer(self, description: str) -> tuple:
-        """
-        DEPRECATED: Use categorize_smart() instead
-        """
-        raise DeprecationWarning("Use categorize_smart() instead of categorize_transfer()")
-    
     def load_rules_from_file(self, file_path: str):
         """
         Carrega regras de arquivo YAML
@@ -157,8 +239,10 @@ class TransactionCategorizer:
         try:
             import yaml
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                rules = yaml.safe_load(f)
+            # Loader em C (libyaml) quando o PyYAML foi compilado com ele
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(file_path, 'rb') as f:
+                rules = yaml.load(f, Loader=loader)
             
             # Carregar receitas
             if 'receitas' in rules:
@@ -7,11 +7,74 @@ Responsável por extrair mês-ano de arquivos OFX
 
 import re
 import logging
-from datetime import datetime
+from collections import Counter
+from functools import lru_cache
+from datetime import date, datetime
 from pathlib import Path
+from typing import Iterable
 
 logger = logging.getLogger(__name__)
 
+# Regexes compiladas uma vez por processo
+_STMTTRN_RE = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.DOTALL)
+_SALDO_RE = re.compile(r'<NAME>Saldo', re.IGNORECASE)
+_DTPOSTED_RE = re.compile(r'<DTPOSTED>(\d{8})')
+_DTSTART_RE = re.compile(r'<DTSTART>(\d{8})')
+_FILENAME_MONTH_YEAR_RE = re.compile(r'(\d{1,2})[-_]?(\d{4})')
+
+# Variantes em bytes para rodar direto sobre o mmap do OFX (sem decodificar)
+_STMTTRN_BYTES_RE = re.compile(rb'<STMTTRN>(.*?)</STMTTRN>', re.DOTALL)
+_SALDO_BYTES_RE = re.compile(rb'<NAME>Saldo', re.IGNORECASE)
+_DTPOSTED_BYTES_RE = re.compile(rb'<DTPOSTED>(\d{8})')
+_DTSTART_BYTES_RE = re.compile(rb'<DTSTART>(\d{8})')
+
+
+def _current_month_year() -> str:
+    """Mes-ano atual ('MM-YYYY'), usado quando nenhuma data e encontrada"""
+    today = date.today()
+    return f"{today.month:02d}-{today.year}"
+
+
+@lru_cache(maxsize=4096)
+def _format_ofx_digits(date_str: str) -> str:
+    """
+    Converte YYYYMMDD[HHMMSS] para YYYY-MM-DD HH:MM:SS (ver parse_ofx_date)
+    
+    Em cache: um extrato repete as mesmas datas em muitas transacoes.
+    Datas invalidas levantam ValueError (excecoes nao entram no cache).
+    Ano < 1900 e trocado pelo ano corrente antes, em parse_ofx_date, para
+    o cache nao guardar o ano de quem chamou primeiro.
+    """
+    year = int(date_str[0:4])
+    month = int(date_str[4:6])
+    day = int(date_str[6:8])
+    
+    # Extrair hora se disponível (YYYYMMDDHHMMSS)
+    hour = 0
+    minute = 0
+    second = 0
+    if len(date_str) >= 14:
+        hour = int(date_str[8:10])
+        minute = int(date_str[10:12])
+        second = int(date_str[12:14])
+    
+    # Validar mes e dia
+    if month > 12:
+        month = 12
+    if day > 31 or day == 0:
+        day = 1
+    
+    # Validar hora
+    if hour > 23:
+        hour = 0
+    if minute > 59:
+        minute = 0
+    if second > 59:
+        second = 0
+    
+    date_obj = datetime(year, month, day, hour, minute, second)
+    return date_obj.strftime('%Y-%m-%d %H:%M:%S')
+
 
 class DateExtractor:
     """Extrai datas de arquivos OFX e nomes de arquivo"""
@@ -26,45 +89,76 @@ class DateExtractor:
         Returns:
             String no formato 'MM-YYYY'
         """
-        try:
-            # Procurar por todas as transacoes STMTTRN
-            transactions = re.findall(r'<STMTTRN>(.*?)</STMTTRN>', content, re.DOTALL)
+        return self._extract_month_year(
+            content, _STMTTRN_RE, _SALDO_RE, _DTPOSTED_RE, _DTSTART_RE
+        )
+    
+    def extract_month_year_from_ofx_bytes(self, content) -> str:
+        """
+        Igual a extract_month_year_from_ofx, mas sobre bytes/mmap sem decodificar
+        
+        Args:
+            content: Conteúdo do OFX como bytes, bytearray ou mmap
             
-            month_year_counts = {}
+        Returns:
+            String no formato 'MM-YYYY'
+        """
+        return self._extract_month_year(
+            content, _STMTTRN_BYTES_RE, _SALDO_BYTES_RE, _DTPOSTED_BYTES_RE, _DTSTART_BYTES_RE
+        )
+    
+    def _extract_month_year(self, content, stmttrn_re, saldo_re, dtposted_re, dtstart_re) -> str:
+        """Implementação comum para conteúdo str ou bytes (regexes do mesmo tipo)"""
+        try:
+            # Datas DTPOSTED contadas por valor: um extrato tem poucas datas
+            # distintas, entao o strptime roda uma vez por data distinta
+            posted_dates = Counter()
             
-            for trn in transactions:
+            # Percorrer as transacoes STMTTRN sem copiar o corpo de cada uma:
+            # as buscas internas usam a janela (pos, endpos) do proprio conteudo
+            for trn_match in stmttrn_re.finditer(content):
+                trn_start, trn_end = trn_match.span(1)
+                
                 # Pular transacoes de "Saldo" (Saldo Anterior, Saldo do dia)
-                if re.search(r'<NAME>Saldo', trn, re.IGNORECASE):
+                if saldo_re.search(content, trn_start, trn_end):
                     continue
                 
                 # Extrair data desta transacao
-                date_match = re.search(r'<DTPOSTED>(\d{8})', trn)
+                date_match = dtposted_re.search(content, trn_start, trn_end)
                 if date_match:
-                    date_str = date_match.group(1)
-                    try:
-                        date_obj = datetime.strptime(date_str, '%Y%m%d')
-                        month_year = date_obj.strftime('%m-%Y')
-                        month_year_counts[month_year] = month_year_counts.get(month_year, 0) + 1
-                    except:
-                        continue
+                    posted_dates[date_match.group(1)] += 1
+            
+            month_year_counts = Counter()
+            
+            for date_value, count in posted_dates.items():
+                try:
+                    date_obj = datetime.strptime(self._as_str(date_value), '%Y%m%d')
+                    month_year = date_obj.strftime('%m-%Y')
+                    month_year_counts[month_year] += count
+                except:
+                    continue
             
             # Usar o mes-ano mais frequente
             if month_year_counts:
-                most_common = max(month_year_counts.items(), key=lambda x: x[1])
-                return most_common[0]
+                return month_year_counts.most_common(1)[0][0]
 
             # Fallback: DTSTART/DTEND
-            start_match = re.search(r'<DTSTART>(\d{8})', content)
+            start_match = dtstart_re.search(content)
             if start_match:
-                date_obj = datetime.strptime(start_match.group(1), '%Y%m%d')
+                date_obj = datetime.strptime(self._as_str(start_match.group(1)), '%Y%m%d')
                 return date_obj.strftime('%m-%Y')
 
             # Ultimo fallback: data atual
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
 
         except Exception as e:
             logger.warning(f"Erro ao extrair data do OFX: {e}")
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
+    
+    @staticmethod
+    def _as_str(value) -> str:
+        """Converte grupo de regex (str ou bytes ASCII) para str"""
+        return value.decode('ascii') if isinstance(value, bytes) else value
     
     def extract_from_filename(self, filename: str) -> str:
         """
@@ -77,33 +171,37 @@ class DateExtractor:
         """
         try:
             # Padrão: 112025 ou 11-2025
-            match = re.search(r'(\d{1,2})[-_]?(\d{4})', filename)
+            match = _FILENAME_MONTH_YEAR_RE.search(filename)
             if match:
                 month = match.group(1).zfill(2)
                 year = match.group(2)
                 return f"{month}-{year}"
             
             # Fallback: mes atual
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
             
         except Exception as e:
             logger.warning(f"Erro ao extrair data do nome: {e}")
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
     
-    def extract_month_year_from_transactions(self, dates: list) -> str:
+    def extract_month_year_from_transactions(self, dates: Iterable[str]) -> str:
         """
         Extrai mes-ano mais frequente de uma lista de datas
         
+        As datas sao contadas primeiro (um extrato tem poucas datas
+        distintas), entao o strptime roda uma vez por data distinta e nao
+        uma vez por transacao.
+        
         Args:
-            dates: Lista de datas no formato YYYY-MM-DD
+            dates: Datas no formato YYYY-MM-DD (aceita qualquer iteravel)
             
         Returns:
             String no formato 'MM-YYYY' do mes mais frequente
         """
         try:
-            month_year_counts = {}
+            month_year_counts = Counter()
             
-            for date_str in dates:
+            for date_str, count in Counter(dates).items():
                 try:
                     # Se tem hora (YYYY-MM-DD HH:MM:SS), pegar apenas a data
                     date_part = date_str.split(' ')[0] if ' ' in date_str else date_str
@@ -111,21 +209,20 @@ class DateExtractor:
                     # Parse YYYY-MM-DD
                     date_obj = datetime.strptime(date_part, '%Y-%m-%d')
                     month_year = date_obj.strftime('%m-%Y')
-                    month_year_counts[month_year] = month_year_counts.get(month_year, 0) + 1
+                    month_year_counts[month_year] += count
                 except:
                     continue
             
             # Usar o mes-ano mais frequente
             if month_year_counts:
-                most_common = max(month_year_counts.items(), key=lambda x: x[1])
-                return most_common[0]
+                return month_year_counts.most_common(1)[0][0]
             
             # Fallback: mes atual
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
             
         except Exception as e:
             logger.warning(f"Erro ao extrair mes-ano de transacoes: {e}")
-            return datetime.now().strftime('%m-%Y')
+            return _current_month_year()
     
     def parse_ofx_date(self, date_str: str) -> str:
         """
@@ -147,39 +244,14 @@ class DateExtractor:
             date_str = date_str.split('[')[0].strip()
             
             if len(date_str) >= 8:
-                year = int(date_str[0:4])
-                month = int(date_str[4:6])
-                day = int(date_str[6:8])
-                
-                # Extrair hora se disponível (YYYYMMDDHHMMSS)
-                hour = 0
-                minute = 0
-                second = 0
-                if len(date_str) >= 14:
-                    hour = int(date_str[8:10])
-                    minute = int(date_str[10:12])
-                    second = int(date_str[12:14])
-                
-                # Corrigir ano invalido
-                if year < 1900:
-                    year = datetime.now().year
-                
-                # Validar mes e dia
-                if month > 12:
-                    month = 12
-                if day > 31 or day == 0:
-                    day = 1
+                # Digitos alem de YYYYMMDDHHMMSS (ex: .000) nao entram no resultado
+                digits = date_str[:14]
                 
-                # Validar hora
-                if hour > 23:
-                    hour = 0
-                if minute > 59:
-                    minute = 0
-                if second > 59:
-                    second = 0
+                # Corrigir ano invalido fora do cache (o ano corrente muda)
+                if int(digits[0:4]) < 1900:
+                    digits = f"{datetime.now().year:04d}{digits[4:]}"
                 
-                date_obj = datetime(year, month, day, hour, minute, second)
-                return date_obj.strftime('%Y-%m-%d %H:%M:%S')
+                return _format_ofx_digits(digits)
             
             return ''
         except Exception as e:
@@ -6,12 +6,31 @@ Responsável por escrever arquivos CSV no formato do ezBookkeeping
 """
 
 import csv
+import re
 import logging
 from pathlib import Path
 from datetime import datetime
+from typing import Iterable, List
 
 logger = logging.getLogger(__name__)
 
+# Valor já no formato de saída (duas casas, sem zeros à esquerda), com sinal opcional
+_PLAIN_AMOUNT_RE = re.compile(r'-?((?:0|[1-9]\d*)\.\d{2})')
+
+
+def _format_amount(amount) -> str:
+    """
+    Valor absoluto com duas casas decimais
+    
+    Strings como '-123.45' (formato dos parsers) só perdem o sinal, sem ida
+    e volta por float; os demais valores passam por abs(float()).
+    """
+    if isinstance(amount, str):
+        match = _PLAIN_AMOUNT_RE.fullmatch(amount)
+        if match:
+            return match.group(1)
+    return f"{abs(float(amount)):.2f}"
+
 
 class EZBookkeepingCSVWriter:
     """Escreve arquivos CSV no formato do ezBookkeeping"""
@@ -24,6 +43,9 @@ class EZBookkeepingCSVWriter:
         'Geographic Location', 'Tags', 'Description'
     ]
     
+    # Buffer de escrita: um extrato inteiro cabe em poucas chamadas write()
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, account_name='MercadoPago', currency='BRL', timezone='-03:00'):
         """
         Inicializa o escritor CSV
@@ -47,7 +69,7 @@ class EZBookkeepingCSVWriter:
             filepath: Path do arquivo CSV
         """
         try:
-            self.file = open(filepath, 'w', newline='', encoding='utf-8')
+            self.file = open(filepath, 'w', newline='', encoding='utf-8', buffering=self.BUFFER_SIZE)
             self.writer = csv.writer(self.file)
             self.writer.writerow(self.HEADER)
             logger.debug(f"Arquivo CSV criado: {filepath}")
@@ -55,12 +77,12 @@ class EZBookkeepingCSVWriter:
             logger.error(f"Erro ao criar arquivo CSV: {e}")
             raise
     
-    def write_transfer(self, date, amount: str, description: str,
+    def format_transfer(self, date, amount: str, description: str,
                       category: str = 'Transferência Geral',
                       subcategory: str = 'Transferência Bancária',
                       account: str = '', tags: str = ''):
         """
-        Escreve uma transação de transferência
+        Monta a linha CSV de uma transação de transferência
         
         Args:
             date: datetime object ou string YYYY-MM-DD HH:MM:SS
@@ -77,7 +99,7 @@ class EZBookkeepingCSVWriter:
         time_str = str(date)
         
         # Valor absoluto para transferências
-        amount_val = abs(float(amount))
+        amount_str = _format_amount(amount)
         
         row = [
             time_str,                    # Time
@@ -87,21 +109,28 @@ class EZBookkeepingCSVWriter:
             subcategory,                 # Sub Category
             account,                     # Account (pode ser preenchido via matcher)
             self.currency,               # Account Currency
-            f"{amount_val:.2f}",        # Amount
+            amount_str,                  # Amount
             '',                          # Account2 (vazio - usuário preenche)
             self.currency,               # Account2 Currency
-            f"{amount_val:.2f}",        # Account2 Amount
+            amount_str,                  # Account2 Amount
             '',                          # Geographic Location
             tags,                        # Tags
             description                  # Description
         ]
         
-        self.writer.writerow(row)
+        return row
     
-    def write_expense(self, date, amount: str, description: str,
+    def write_transfer(self, date, amount: str, description: str,
+                      category: str = 'Transferência Geral',
+                      subcategory: str = 'Transferência Bancária',
+                      account: str = '', tags: str = ''):
+        """Escreve uma transação de transferência (ver format_transfer)"""
+        self.writer.writerow(self.format_transfer(date, amount, description, category, subcategory, account, tags))
+    
+    def format_expense(self, date, amount: str, description: str,
                      category: str, subcategory: str = '', account: str = '', tags: str = ''):
         """
-        Escreve uma transação de despesa
+        Monta a linha CSV de uma transação de despesa
         
         Args:
             date: datetime object ou string YYYY-MM-DD HH:MM:SS
@@ -116,7 +145,7 @@ class EZBookkeepingCSVWriter:
         time_str = str(date)
         
         # Valor absoluto para despesas
-        amount_val = abs(float(amount))
+        amount_str = _format_amount(amount)
         
         row = [
             time_str,                    # Time
@@ -126,7 +155,7 @@ class EZBookkeepingCSVWriter:
             subcategory,                 # Sub Category
             account,                     # Account (pode ser preenchido via matcher)
             self.currency,               # Account Currency
-            f"{amount_val:.2f}",        # Amount
+            amount_str,                  # Amount
             '',                          # Account2
             '',                          # Account2 Currency
             '',                          # Account2 Amount
@@ -135,12 +164,17 @@ class EZBookkeepingCSVWriter:
             description                  # Description
         ]
         
-        self.writer.writerow(row)
+        return row
     
-    def write_income(self, date, amount: str, description: str,
+    def write_expense(self, date, amount: str, description: str,
+                     category: str, subcategory: str = '', account: str = '', tags: str = ''):
+        """Escreve uma transação de despesa (ver format_expense)"""
+        self.writer.writerow(self.format_expense(date, amount, description, category, subcategory, account, tags))
+    
+    def format_income(self, date, amount: str, description: str,
                     category: str, subcategory: str = '', account: str = '', tags: str = ''):
         """
-        Escreve uma transação de receita
+        Monta a linha CSV de uma transação de receita
         
         Args:
             date: datetime object ou string YYYY-MM-DD HH:MM:SS
@@ -155,7 +189,7 @@ class EZBookkeepingCSVWriter:
         time_str = str(date)
         
         # Valor absoluto para receitas
-        amount_val = abs(float(amount))
+        amount_str = _format_amount(amount)
         
         row = [
             time_str,                    # Time
@@ -165,7 +199,7 @@ class EZBookkeepingCSVWriter:
             subcategory,                 # Sub Category
             account,                     # Account (pode ser preenchido via matcher)
             self.currency,               # Account Currency
-            f"{amount_val:.2f}",        # Amount
+            amount_str,                  # Amount
             '',                          # Account2
             '',                          # Account2 Currency
             '',                          # Account2 Amount
@@ -174,7 +208,21 @@ class EZBookkeepingCSVWriter:
             description                  # Description
         ]
         
-        self.writer.writerow(row)
+        return row
+    
+    def write_income(self, date, amount: str, description: str,
+                    category: str, subcategory: str = '', account: str = '', tags: str = ''):
+        """Escreve uma transação de receita (ver format_income)"""
+        self.writer.writerow(self.format_income(date, amount, description, category, subcategory, account, tags))
+    
+    def write_rows(self, rows: Iterable[List[str]]):
+        """
+        Escreve várias linhas já montadas (format_*) com um único writerows()
+        
+        Args:
+            rows: Linhas CSV
+        """
+        self.writer.writerows(rows)
     
     def close(self):
         """Fecha o arquivo CSV"""
@@ -182,3 +230,9 @@ class EZBookkeepingCSVWriter:
             self.file.close()
             self.file = None
             self.writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
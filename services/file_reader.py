@@ -5,12 +5,106 @@ OFX File Reader Service
 Responsável por ler arquivos OFX com detecção automática de encoding
 """
 
+import codecs
 import logging
+import mmap
 import re
+from functools import cached_property, lru_cache
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Regexes do cabeçalho OFX, compiladas uma vez por processo
+_CHARSET_RE = re.compile(r'CHARSET[:\s]*(\S+)', re.IGNORECASE)
+_ENCODING_RE = re.compile(r'ENCODING[:\s]*(\S+)', re.IGNORECASE)
+
+
+# Tamanho dos blocos usados para validar o encoding sem decodificar tudo de uma vez
+_DECODE_CHUNK_SIZE = 1 << 16
+
+# Bytes iniciais analisados em busca de CHARSET/ENCODING
+_HEADER_SIZE = 500
+
+# Mapeamento de CHARSET OFX para encoding Python
+_CHARSET_MAP = {
+    '1252': 'cp1252',
+    'ANSI': 'cp1252',
+    'ISO-8859-1': 'latin-1',
+    '8859-1': 'latin-1',
+    'NONE': 'utf-8',
+    'UTF-8': 'utf-8',
+}
+
+
+@lru_cache(maxsize=64)
+def _encoding_from_preamble(preamble: bytes) -> Optional[str]:
+    """
+    Encoding declarado no cabeçalho OFX (CHARSET/ENCODING) ou None
+    
+    O cabeçalho antes de <OFX> é o mesmo em todos os extratos de um banco,
+    então cada banco é analisado uma vez por processo.
+    """
+    header = preamble.decode('ascii', errors='ignore')
+    
+    # Procurar CHARSET no cabeçalho
+    charset_match = _CHARSET_RE.search(header)
+    if charset_match:
+        charset = charset_match.group(1).upper()
+        if charset in _CHARSET_MAP:
+            logger.debug(f"CHARSET declarado no OFX: {charset} -> {_CHARSET_MAP[charset]}")
+            return _CHARSET_MAP[charset]
+    
+    # Procurar ENCODING no cabeçalho
+    encoding_match = _ENCODING_RE.search(header)
+    if encoding_match:
+        encoding = encoding_match.group(1).upper()
+        if encoding == 'UTF-8':
+            return 'utf-8'
+        elif encoding == 'USASCII' or encoding == 'ASCII':
+            # USASCII geralmente significa que CHARSET define o encoding real
+            # (já verificado acima)
+            return 'cp1252'  # Default para arquivos brasileiros
+    
+    return None
+
+
+def _header_preamble(head: bytes) -> bytes:
+    """Parte do cabeçalho antes de <OFX> (sem DTSERVER e demais dados do extrato)"""
+    end = head.find(b'<OFX>')
+    return head[:end] if end >= 0 else head
+
+
+class OFXContent:
+    """
+    Conteúdo de um arquivo OFX mapeado em memória (mmap)
+    
+    Regexes em bytes rodam direto sobre `buffer`; o texto decodificado só é
+    criado se `text` for acessado (parse regex fallback).
+    """
+    
+    def __init__(self, file_path: Path, buffer, encoding: str, errors: str = 'strict'):
+        self.file_path = file_path
+        self.buffer = buffer
+        self.encoding = encoding
+        self.errors = errors
+    
+    @cached_property
+    def text(self) -> str:
+        """Conteúdo decodificado com o encoding detectado"""
+        return str(self.buffer, self.encoding, self.errors)
+    
+    def close(self):
+        """Libera o mapeamento do arquivo"""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 
 class OFXFileReader:
     """Lê arquivos OFX tentando múltiplos encodings"""
@@ -18,105 +112,45 @@ class OFXFileReader:
     def __init__(self):
         self.encodings = ['utf-8', 'latin-1', 'cp1252']
         # Mapeamento de CHARSET OFX para encoding Python
-        self.charset_map = {
-            '1252': 'cp1252',
-            'ANSI': 'cp1252',
-            'ISO-8859-1': 'latin-1',
-            '8859-1': 'latin-1',
-            'NONE': 'utf-8',
-            'UTF-8': 'utf-8',
-        }
+        self.charset_map = _CHARSET_MAP
     
-    def read_with_encoding_detection(self, file_path: Path) -> str:
+    def open_mapped(self, file_path: Path) -> OFXContent:
         """
-        Lê arquivo OFX tentando detectar encoding automaticamente
+        Mapeia arquivo OFX em memória e detecta o encoding sem criar a string
+        
+        Ordem de tentativa: encoding declarado, UTF-8, latin-1, cp1252 e por
+        fim latin-1 com replace.
         
         Args:
             file_path: Path do arquivo OFX
             
         Returns:
-            Conteúdo do arquivo como string
+            OFXContent (usar como context manager ou chamar close())
         """
-        # Primeiro, ler o cabeçalho em modo binário para detectar encoding declarado
-        declared_encoding = self._detect_encoding_from_header(file_path)
-        
-        if declared_encoding:
-            content = self._try_encoding(file_path, declared_encoding)
-            if content:
-                logger.debug(f"Arquivo lido com encoding declarado: {declared_encoding}")
-                return content
-        
-        # Tentar UTF-8 primeiro (padrão declarado em muitos OFX)
-        content = self._try_encoding(file_path, 'utf-8')
-        if content:
-            logger.debug(f"Arquivo lido com encoding: UTF-8")
-            return content
+        with open(file_path, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Arquivo vazio não pode ser mapeado
+                buffer = b''
         
-        # Tentar latin-1 (comum em bancos brasileiros)
-        content = self._try_encoding(file_path, 'latin-1')
-        if content:
-            logger.debug(f"Arquivo lido com encoding: latin-1 (fallback)")
-            return content
+        declared_encoding = _encoding_from_preamble(_header_preamble(bytes(buffer[:_HEADER_SIZE])))
+        candidates = [declared_encoding, 'utf-8', 'latin-1', 'cp1252']
+        for encoding in candidates:
+            if encoding and self._is_decodable(buffer, encoding):
+                logger.debug(f"Arquivo mapeado com encoding: {encoding}")
+                return OFXContent(file_path, buffer, encoding)
         
-        # Último recurso: cp1252 (Windows)
-        content = self._try_encoding(file_path, 'cp1252')
-        if content:
-            logger.debug(f"Arquivo lido com encoding: cp1252 (fallback)")
-            return content
-        
-        # Fallback final: latin-1 com replace
         logger.warning(f"Nao foi possivel detectar encoding, usando latin-1 com replace")
-        with open(file_path, 'r', encoding='latin-1', errors='replace') as f:
-            return f.read()
-    
-    def _detect_encoding_from_header(self, file_path: Path) -> str:
-        """
-        Detecta encoding a partir do cabeçalho OFX
-        
-        Args:
-            file_path: Path do arquivo OFX
-            
-        Returns:
-            Encoding detectado ou None
-        """
-        try:
-            # Ler primeiros bytes em modo binário para analisar cabeçalho
-            with open(file_path, 'rb') as f:
-                header = f.read(500).decode('ascii', errors='ignore')
-            
-            # Procurar CHARSET no cabeçalho
-            charset_match = re.search(r'CHARSET[:\s]*(\S+)', header, re.IGNORECASE)
-            if charset_match:
-                charset = charset_match.group(1).upper()
-                if charset in self.charset_map:
-                    logger.debug(f"CHARSET declarado no OFX: {charset} -> {self.charset_map[charset]}")
-                    return self.charset_map[charset]
-            
-            # Procurar ENCODING no cabeçalho
-            encoding_match = re.search(r'ENCODING[:\s]*(\S+)', header, re.IGNORECASE)
-            if encoding_match:
-                encoding = encoding_match.group(1).upper()
-                if encoding == 'UTF-8':
-                    return 'utf-8'
-                elif encoding == 'USASCII' or encoding == 'ASCII':
-                    # USASCII geralmente significa que CHARSET define o encoding real
-                    charset_match = re.search(r'CHARSET[:\s]*(\S+)', header, re.IGNORECASE)
-                    if charset_match:
-                        charset = charset_match.group(1).upper()
-                        if charset in self.charset_map:
-                            return self.charset_map[charset]
-                    return 'cp1252'  # Default para arquivos brasileiros
-            
-            return None
-            
-        except Exception as e:
-            logger.debug(f"Erro ao detectar encoding do cabeçalho: {e}")
-            return None
+        return OFXContent(file_path, buffer, 'latin-1', errors='replace')
     
-    def _try_encoding(self, file_path: Path, encoding: str) -> str:
-        """Tenta ler arquivo com encoding específico"""
+    def _is_decodable(self, buffer, encoding: str) -> bool:
+        """Valida o encoding decodificando em blocos, sem manter o texto"""
+        decoder = codecs.getincrementaldecoder(encoding)('strict')
         try:
-            with open(file_path, 'r', encoding=encoding, errors='strict') as f:
-                return f.read()
+            for start in range(0, len(buffer), _DECODE_CHUNK_SIZE):
+                decoder.decode(buffer[start:start + _DECODE_CHUNK_SIZE])
+            decoder.decode(b'', final=True)
+            return True
         except UnicodeDecodeError:
-            return None
+            return False
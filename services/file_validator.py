@@ -5,51 +5,113 @@ File Validator Service
 Responsável por validar arquivos OFX
 """
 
+import codecs
 from pathlib import Path
+from typing import Optional
+from services.xp_cc_parser import XPCCParser
+from services.xp_conta_parser import XPContaParser
 
 
 class FileValidator:
     """Valida arquivos OFX/QFX e CSV"""
     
-    def is_valid_ofx_file(self, file_path: Path) -> bool:
+    # Tipos retornados por classify()
+    OFX = 'ofx'
+    RICO_INVESTIMENTO_XLSX = 'rico_investimento_xlsx'
+    RICO_CSV = 'rico_csv'
+    XP_CC_CSV = 'xp_cc_csv'
+    XP_CONTA_CSV = 'xp_conta_csv'
+    MERCADOPAGO_CSV = 'mercadopago_csv'
+    
+    OFX_SUFFIXES = frozenset({'.ofx', '.qfx'})
+    
+    # Janela lida para detectar o cabeçalho de CSV (XP CC: 43 bytes + BOM)
+    HEADER_SNIFF_BYTES = 64
+    
+    def classify(self, file_path: Path) -> Optional[str]:
         """
-        Verifica se é um arquivo OFX/QFX válido
+        Identifica o tipo do arquivo com no máximo uma leitura do cabeçalho
+        
+        Extensão e nome primeiro; CSV fora da Rico lê a primeira linha uma
+        única vez para distinguir XP CC e XP Conta; qualquer outro CSV é
+        tratado como Mercado Pago. É a única detecção de tipo por cabeçalho:
+        os parsers só conferem o cabeçalho ao ler o arquivo.
         
         Args:
-            file_path: Path do arquivo a validar
+            file_path: Path do arquivo a classificar
             
         Returns:
-            True se arquivo tem extensão .ofx ou .qfx
+            Uma das constantes de tipo (OFX, RICO_CSV, ...) ou None se não suportado
         """
-        return file_path.suffix.lower() in ['.ofx', '.qfx']
+        suffix = file_path.suffix.lower()
+        if suffix in self.OFX_SUFFIXES:
+            return self.OFX
+        
+        filename_lower = file_path.stem.lower()
+        if suffix == '.xlsx':
+            if 'rico' in filename_lower and 'investimento' in filename_lower:
+                return self.RICO_INVESTIMENTO_XLSX
+            return None
+        
+        if suffix != '.csv':
+            return None
+        
+        if 'rico' in filename_lower:
+            return self.RICO_CSV
+        
+        header = self._read_first_line(file_path)
+        if header == XPCCParser.EXPECTED_HEADER:
+            return self.XP_CC_CSV
+        if header == XPContaParser.EXPECTED_HEADER:
+            return self.XP_CONTA_CSV
+        return self.MERCADOPAGO_CSV
     
-    def is_valid_mercadopago_csv(self, file_path: Path) -> bool:
+    @staticmethod
+    def _read_first_line(file_path: Path) -> Optional[str]:
         """
-        Verifica se é um arquivo CSV válido
+        Primeira linha do arquivo sem BOM/espaços, ou None se ilegível
+        
+        Os cabeçalhos procurados cabem nos primeiros bytes: lê só essa
+        janela em modo binário, sem TextIOWrapper/decoder. Linha maior que
+        a janela cai na leitura de texto normal.
+        """
+        try:
+            with open(file_path, 'rb', buffering=0) as f:
+                head = f.read(FileValidator.HEADER_SNIFF_BYTES)
+            
+            lines = head.removeprefix(codecs.BOM_UTF8).splitlines(keepends=True)
+            first = lines[0] if lines else b''
+            if len(head) < FileValidator.HEADER_SNIFF_BYTES or first.endswith((b'\n', b'\r')):
+                return first.decode('utf-8').strip()
+            
+            with open(file_path, 'r', encoding='utf-8-sig') as f:
+                return f.readline().strip()
+        except Exception:
+            return None
+    
+    def is_valid_ofx_file(self, file_path: Path) -> bool:
+        """
+        Verifica se é um arquivo OFX/QFX válido
         
         Args:
             file_path: Path do arquivo a validar
             
         Returns:
-            True se arquivo tem extensão .csv
+            True se arquivo tem extensão .ofx ou .qfx
         """
-        return file_path.suffix.lower() == '.csv'
+        return file_path.suffix.lower() in self.OFX_SUFFIXES
     
-    def is_valid_rico_csv(self, file_path: Path) -> bool:
+    def is_valid_mercadopago_csv(self, file_path: Path) -> bool:
         """
-        Verifica se é um arquivo CSV da Rico
+        Verifica se é um arquivo CSV válido
         
         Args:
             file_path: Path do arquivo a validar
             
         Returns:
-            True se arquivo CSV tem "rico" no nome (case insensitive)
+            True se arquivo tem extensão .csv
         """
-        if file_path.suffix.lower() != '.csv':
-            return False
-        
-        # Detectar pela palavra "rico" no nome do arquivo
-        return 'rico' in file_path.stem.lower()
+        return file_path.suffix.lower() == '.csv'
     
     def is_valid_rico_investimento_xlsx(self, file_path: Path) -> bool:
         """
@@ -67,41 +129,3 @@ class FileValidator:
         # Detectar por "rico" e "investimento" no nome
         filename_lower = file_path.stem.lower()
         return 'rico' in filename_lower and 'investimento' in filename_lower
-    
-    def is_valid_xp_cc_csv(self, file_path: Path) -> bool:
-        """
-        Verifica se é um arquivo CSV de fatura XP CC
-        
-        Args:
-            file_path: Path do arquivo a validar
-            
-        Returns:
-            True se arquivo CSV tem o cabeçalho do XP CC
-        """
-        if file_path.suffix.lower() != '.csv':
-            return False
-        
-        # Importar aqui para evitar circular import
-        from services.xp_cc_parser import XPCCParser
-        
-        # Detectar pelo cabeçalho do arquivo
-        return XPCCParser.is_xp_cc_csv(file_path)
-    
-    def is_valid_xp_conta_csv(self, file_path: Path) -> bool:
-        """
-        Verifica se é um arquivo CSV de extrato da conta digital XP
-        
-        Args:
-            file_path: Path do arquivo a validar
-            
-        Returns:
-            True se arquivo CSV tem o cabeçalho da conta XP
-        """
-        if file_path.suffix.lower() != '.csv':
-            return False
-        
-        # Importar aqui para evitar circular import
-        from services.xp_conta_parser import XPContaParser
-        
-        # Detectar pelo cabeçalho do arquivo
-        return XPContaParser.is_xp_conta_csv(file_path)
@@ -6,21 +6,31 @@ Responsável por parsear arquivos CSV exportados do Mercado Pago e gerar transa
 """
 
 import csv
-import re
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, NamedTuple, Optional
 from datetime import datetime
+from services.transaction import Transaction
+from services.br_format import BR_NUMBER_TABLE
 
 logger = logging.getLogger(__name__)
 
 
+class MercadoPagoParseResult(NamedTuple):
+    """Resultado de MercadoPagoParser.parse (arquivo lido uma única vez)"""
+    transactions: List[Transaction]
+    first_date_for_filename: Optional[str]  # DD-MM-YYYY da primeira transação
+
+
 class MercadoPagoParser:
     """Parser de arquivos CSV do Mercado Pago com suporte a transferências Pix"""
     
     # Identificador único do CSV do Mercado Pago
     EXPECTED_HEADER = "RELEASE_DATE;TRANSACTION_TYPE;REFERENCE_ID;TRANSACTION_NET_AMOUNT;PARTIAL_BALANCE"
     
+    # Buffer de leitura (extratos são lidos inteiros em poucas chamadas read())
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, text_normalizer, categorizer, date_extractor):
         """
         Inicializa o parser com dependências
@@ -34,124 +44,153 @@ class MercadoPagoParser:
         self.categorizer = categorizer
         self.date_extractor = date_extractor
     
-    @staticmethod
-    def is_mercadopago_csv(file_path: Path) -> bool:
+    def parse(self, file_path: Path) -> Optional[MercadoPagoParseResult]:
         """
-        Verifica se o arquivo é um CSV do Mercado Pago
+        Detecta, parseia e extrai a data do CSV do Mercado Pago em uma passada
+        
+        Confere o cabeçalho, parseia as linhas e guarda a data da primeira
+        transação abrindo o arquivo uma única vez.
         
         Args:
             file_path: Path do arquivo CSV
             
         Returns:
-            True se for CSV do Mercado Pago
+            MercadoPagoParseResult (transactions vazio se o parse falhar)
+            ou None se o arquivo não for CSV do Mercado Pago
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # Pular primeiras 3 linhas (resumo)
+            f = open(file_path, 'r', encoding='utf-8', buffering=self.BUFFER_SIZE)
+        except OSError as e:
+            logger.error(f"Erro ao abrir CSV Mercado Pago: {e}")
+            return None
+        
+        with f:
+            try:
+                # Pular primeiras 3 linhas (resumo com saldo inicial/final)
                 for _ in range(3):
                     f.readline()
                 # Linha 4 deve conter o cabeçalho
                 header = f.readline().strip()
-                return header == MercadoPagoParser.EXPECTED_HEADER
-        except Exception as e:
-            logger.debug(f"Erro ao verificar CSV Mercado Pago: {e}")
-            return False
-    
-    def parse_csv(self, file_path: Path) -> Optional[List[Dict]]:
-        """
-        Parse do arquivo CSV do Mercado Pago
-        
-        Args:
-            file_path: Path do arquivo CSV
+            except Exception as e:
+                logger.debug(f"Erro ao verificar CSV Mercado Pago: {e}")
+                return None
+            
+            if header != self.EXPECTED_HEADER:
+                return None
             
-        Returns:
-            Lista de transações ou None se falhar
-        """
-        try:
             transactions = []
+            first_date = None
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # Pular primeiras 3 linhas (resumo com saldo inicial/final)
-                for _ in range(3):
-                    f.readline()
+            try:
+                # Colunas na ordem de EXPECTED_HEADER; linhas curtas são
+                # completadas com None
+                columns = len(self.EXPECTED_HEADER.split(';'))
+                padding = [None] * columns
                 
-                # Ler cabeçalho
-                header = f.readline().strip()
-                if header != self.EXPECTED_HEADER:
-                    logger.error(f"Cabeçalho CSV inválido: {header}")
-                    return None
+                # Pular linhas vazias
+                rows = [
+                    (row + padding)[:columns] for row in csv.reader(f, delimiter=';')
+                    if row and row[0].strip()
+                ]
                 
-                # Processar transações
-                csv_reader = csv.DictReader(f, delimiter=';', fieldnames=[
-                    'RELEASE_DATE', 'TRANSACTION_TYPE', 'REFERENCE_ID', 
-                    'TRANSACTION_NET_AMOUNT', 'PARTIAL_BALANCE'
+                if rows:
+                    first_date = rows[0][0].strip()
+                
+                # Converter colunas inteiras: datas e descrições se repetem
+                # muito, então cada valor distinto é convertido uma vez
+                release_dates = [row[0].strip() for row in rows]
+                dates = self._convert_dates(release_dates)
+                descriptions = self.text_normalizer.normalize_batch([
+                    (row[1] or '').strip() for row in rows
                 ])
                 
-                for row in csv_reader:
-                    # Pular linhas vazias
-                    if not row.get('RELEASE_DATE') or not row['RELEASE_DATE'].strip():
-                        continue
-                    
-                    transaction = self._parse_transaction(row)
+                for release_date, row, date, description in zip(release_dates, rows, dates, descriptions):
+                    transaction = self._parse_transaction(release_date, row[3], date, description)
                     if transaction:
                         transactions.append(transaction)
+            except Exception as e:
+                logger.error(f"Erro no parse CSV Mercado Pago: {e}")
+                return MercadoPagoParseResult([], first_date)
+        
+        logger.info(f"Parse Mercado Pago concluído: {len(transactions)} transações")
+        return MercadoPagoParseResult(transactions, first_date)
+    
+    def parse_csv(self, file_path: Path) -> Optional[List[Transaction]]:
+        """
+        Parse do arquivo CSV do Mercado Pago
+        
+        Args:
+            file_path: Path do arquivo CSV
             
-            logger.info(f"Parse Mercado Pago concluído: {len(transactions)} transações")
-            return transactions if transactions else None
-            
-        except Exception as e:
-            logger.error(f"Erro no parse CSV Mercado Pago: {e}")
+        Returns:
+            Lista de transações ou None se falhar
+        """
+        result = self.parse(file_path)
+        if result is None:
+            logger.error(f"Cabeçalho CSV inválido: {file_path.name}")
             return None
+        return result.transactions or None
     
-    def _parse_transaction(self, row: Dict[str, str]) -> Optional[Dict]:
+    def _parse_transaction(self, release_date: str, net_amount: Optional[str],
+                           date: Optional[str], description: str) -> Optional[Transaction]:
         """
         Processa uma linha de transação do CSV
         
         Args:
-            row: Dicionário com dados da linha
+            release_date: RELEASE_DATE original (DD-MM-YYYY), usado nos avisos
+            net_amount: TRANSACTION_NET_AMOUNT original (formato BR)
+            date: Data já convertida (ver _convert_dates) ou None se inválida
+            description: Descrição já sem acentos (ver TextNormalizer.normalize_batch)
             
         Returns:
-            Dicionário com transação formatada ou None se inválida
+            Transaction formatada ou None se inválida
         """
         try:
-            # Extrair e converter data (DD-MM-YYYY -> YYYY-MM-DD)
-            date_str = row['RELEASE_DATE'].strip()
-            date = self._convert_date(date_str)
             if not date:
-                logger.warning(f"Data inválida: {date_str}")
+                logger.warning(f"Data inválida: {release_date}")
                 return None
             
-            # Extrair descrição
-            description = row['TRANSACTION_TYPE'].strip()
             if not description:
                 logger.warning("Descrição vazia, pulando transação")
                 return None
             
-            # Normalizar descrição
-            description = self.text_normalizer.normalize_utf8(description)
+            # Limpar descrição
             description = self.text_normalizer.clean_memo(description)
             
             # Extrair e converter valor (formato BR: 1.000,00 -> US: 1000.00)
-            amount_str = row['TRANSACTION_NET_AMOUNT'].strip()
+            amount_str = net_amount.strip()
             amount = self._convert_amount(amount_str)
             
             # Determinar categoria (com detecção de transferências Pix)
             cat_info = self._categorize_transaction(description, amount)
             
-            return {
-                'date': date,
-                'amount': str(amount),
-                'description': description,
-                'type': cat_info['type'],
-                'category': cat_info['category'],
-                'subcategory': cat_info['subcategory'],
-                'qif_category': cat_info['qif_category']
-            }
+            return Transaction(
+                date=date,
+                amount=str(amount),
+                description=description,
+                type=cat_info['type'],
+                category=cat_info['category'],
+                subcategory=cat_info['subcategory'],
+                qif_category=cat_info['qif_category']
+            )
             
         except Exception as e:
             logger.error(f"Erro ao processar transação: {e}")
             return None
     
+    def _convert_dates(self, date_strs: List[str]) -> List[Optional[str]]:
+        """
+        Converte uma coluna de datas DD-MM-YYYY, uma vez por data distinta
+        
+        Args:
+            date_strs: Datas no formato DD-MM-YYYY
+            
+        Returns:
+            Datas no formato YYYY-MM-DD HH:MM:SS (None onde inválida)
+        """
+        converted = {date_str: self._convert_date(date_str) for date_str in set(date_strs)}
+        return [converted[date_str] for date_str in date_strs]
+    
     def _convert_date(self, date_str: str) -> Optional[str]:
         """
         Converte data de DD-MM-YYYY para YYYY-MM-DD HH:MM:SS
@@ -182,7 +221,7 @@ class MercadoPagoParser:
         """
         try:
             # Remover pontos de milhar e trocar vírgula por ponto
-            amount_clean = amount_str.replace('.', '').replace(',', '.')
+            amount_clean = amount_str.translate(BR_NUMBER_TABLE)
             return float(amount_clean)
         except ValueError:
             logger.warning(f"Valor inválido: {amount_str}, usando 0.00")
@@ -211,39 +250,3 @@ class MercadoPagoParser:
             cat_info['qif_category'] = cat_info['category']
         
         return cat_info
-    
-    def get_date_for_filename(self, file_path: Path) -> Optional[str]:
-        """
-        Extrai a data da primeira transação para usar no nome do arquivo
-        
-        Args:
-            file_path: Path do arquivo CSV
-            
-        Returns:
-            Data no formato DD-MM-YYYY ou None
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # Pular primeiras 3 linhas (resumo)
-                for _ in range(3):
-                    f.readline()
-                
-                # Pular cabeçalho
-                f.readline()
-                
-                # Ler primeira transação
-                csv_reader = csv.DictReader(f, delimiter=';', fieldnames=[
-                    'RELEASE_DATE', 'TRANSACTION_TYPE', 'REFERENCE_ID', 
-                    'TRANSACTION_NET_AMOUNT', 'PARTIAL_BALANCE'
-                ])
-                
-                for row in csv_reader:
-                    date_str = row.get('RELEASE_DATE', '').strip()
-                    if date_str:
-                        return date_str  # Retornar no formato DD-MM-YYYY
-                
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao extrair data do arquivo: {e}")
-            return None
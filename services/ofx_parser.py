@@ -7,14 +7,28 @@ Responsável por parsear arquivos OFX e gerar transações para QIF
 
 import re
 import logging
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Iterator, Optional
+from services.transaction import Transaction
 
 logger = logging.getLogger(__name__)
 
+# Regexes do parse fallback, compiladas uma vez por processo
+_STMTTRN_RE = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.DOTALL)
+_DTPOSTED_RE = re.compile(r'<DTPOSTED>(\d+)')
+_TRNAMT_RE = re.compile(r'<TRNAMT>([^<\r\n]+)')
+_NAME_RE = re.compile(r'<NAME>([^<]+)')
+_MEMO_RE = re.compile(r'<MEMO>([^<]+)')
+_STMTTRN_OPEN_BYTES_RE = re.compile(rb'<STMTTRN>', re.IGNORECASE)
+
+# Separadores de milhar no TRNAMT, nas mesmas regras do toDecimal do ofxparse
+_DOT_BEFORE_COMMA_RE = re.compile(r'\..*,')
+_COMMA_BEFORE_DOT_RE = re.compile(r',.*\.')
+
 
 class OFXParser:
-    """Parser de arquivos OFX com estratégias ofxparse e regex fallback"""
+    """Parser de arquivos OFX com estratégias lxml, regex e ofxparse"""
     
     def __init__(self, text_normalizer, categorizer, date_extractor):
         """
@@ -29,7 +43,7 @@ class OFXParser:
         self.categorizer = categorizer
         self.date_extractor = date_extractor
     
-    def parse_with_ofxparse(self, ofx_file: Path) -> Optional[List[Dict]]:
+    def parse_with_ofxparse(self, ofx_file: Path) -> Optional[List[Transaction]]:
         """
         Parse usando biblioteca ofxparse
         
@@ -62,15 +76,8 @@ class OFXParser:
                     if memo:
                         memo = self.text_normalizer.normalize_utf8(memo)
                     
-                    # Combinar descricao
-                    if payee and memo:
-                        description = f"{payee} - {memo}"
-                    elif payee:
-                        description = payee
-                    elif memo:
-                        description = memo
-                    else:
-                        description = ''
+                    # Combinar descricao ("PAYEE - MEMO", ou so o campo preenchido)
+                    description = ' - '.join(filter(None, (payee, memo)))
                     
                     # Limpar descricao
                     description = self.text_normalizer.clean_memo(description)
@@ -78,15 +85,15 @@ class OFXParser:
                     # Detectar transferências e categorizar
                     cat_info = self._categorize_ofx_transaction(description, txn.amount)
                     
-                    transactions.append({
-                        'date': date,
-                        'amount': amount,
-                        'description': description,
-                        'type': cat_info['type'],
-                        'category': cat_info['category'],
-                        'subcategory': cat_info['subcategory'],
-                        'qif_category': cat_info['qif_category']
-                    })
+                    transactions.append(Transaction(
+                        date=date,
+                        amount=amount,
+                        description=description,
+                        type=cat_info['type'],
+                        category=cat_info['category'],
+                        subcategory=cat_info['subcategory'],
+                        qif_category=cat_info['qif_category']
+                    ))
             
             logger.info(f"Parse ofxparse concluido: {len(transactions)} transacoes")
             return transactions
@@ -95,29 +102,94 @@ class OFXParser:
             logger.error(f"Erro no parse com biblioteca: {e}")
             return None
     
-    def parse_with_regex(self, content: str) -> Optional[List[Dict]]:
+    def iter_lxml_transactions(self, ofx_file: Path, encoding: str = None) -> Iterator[Transaction]:
         """
-        Parse usando regex (fallback)
+        Gera as transações do arquivo em streaming usando lxml.etree.iterparse
+        
+        OFX 1.x é SGML (tags sem fechamento), então usa o parser HTML do lxml
+        em modo recover: cada valor vira o texto da própria tag, tanto em
+        SGML quanto em OFX 2.x (XML). Cada <STMTTRN> é liberado após o uso,
+        mantendo memória constante mesmo em extratos grandes.
         
         Args:
-            content: Conteúdo do arquivo OFX
+            ofx_file: Path do arquivo OFX
+            encoding: Encoding do arquivo (ver OFXFileReader.open_mapped)
+            
+        Yields:
+            Transações na ordem do arquivo
+        """
+        from lxml import etree
+        
+        # Parser HTML converte as tags para minúsculas
+        for _, element in etree.iterparse(str(ofx_file), events=('end',), tag='stmttrn',
+                                          html=True, recover=True, encoding=encoding):
+            fields = {}
+            for child in element.iter():
+                if child is not element and child.text:
+                    fields.setdefault(child.tag, child.text.strip())
+            element.clear()
+            
+            formatted_date = self.date_extractor.parse_ofx_date(fields.get('dtposted', ''))
+            if not formatted_date:
+                continue
+            
+            yield self._build_transaction(
+                formatted_date,
+                fields.get('trnamt', '0.00'),
+                fields.get('name', ''),
+                fields.get('memo', '')
+            )
+    
+    def parse_with_lxml_iterparse(self, ofx_file: Path, encoding: str = None) -> Optional[List[Transaction]]:
+        """
+        Parse em streaming usando lxml.etree.iterparse
+        
+        Materializa iter_lxml_transactions: a cadeia de parsers só pode
+        escrever as saídas depois de saber que o lxml terminou sem erro.
+        
+        Args:
+            ofx_file: Path do arquivo OFX
+            encoding: Encoding do arquivo (ver OFXFileReader.open_mapped)
             
         Returns:
             Lista de transações ou None se falhar
         """
         try:
-            # Encontrar transacoes
-            entries = re.findall(r'<STMTTRN>(.*?)</STMTTRN>', content, re.DOTALL)
+            transactions = list(self.iter_lxml_transactions(ofx_file, encoding))
             
-            if not entries:
-                logger.warning("Nenhuma transacao encontrada")
+            if not transactions:
+                logger.warning("Nenhuma transacao encontrada (lxml)")
                 return None
             
+            logger.info(f"Parse lxml concluido: {len(transactions)} transacoes")
+            return transactions
+            
+        except Exception as e:
+            logger.error(f"Erro no parse lxml: {e}")
+            return None
+    
+    def parse_with_regex(self, content: str) -> Optional[List[Transaction]]:
+        """
+        Parse usando regex (fallback)
+        
+        Args:
+            content: Conteúdo do arquivo OFX
+            
+        Returns:
+            Lista de transações ou None se falhar
+        """
+        try:
             transactions = []
+            found_entries = False
             
-            for entry in entries:
+            # Percorrer os blocos STMTTRN sem copiar cada um: os campos sao
+            # buscados dentro da janela (pos, endpos) do proprio conteudo
+            for entry_match in _STMTTRN_RE.finditer(content):
+                found_entries = True
+                start, end = entry_match.span(1)
+                
                 # Extrair data
-                date_match = re.search(r'<DTPOSTED>(\d+)', entry)
+                date_match = _DTPOSTED_RE.search(content, start, end)
                 if not date_match:
                     continue
                 
@@ -128,62 +200,23 @@ class OFXParser:
                     continue
                 
                 # Extrair valor
-                amt_match = re.search(r'<TRNAMT>([-.\\\d]+)', entry)
-                amount_str = amt_match.group(1) if amt_match else '0.00'
-                
-                # Validar e sanitizar amount
-                try:
-                    # Verificar se é um valor válido (não apenas '-' ou '.')
-                    if amount_str and amount_str not in ['-', '.', '-.']:
-                        amount = float(amount_str)
-                        amount_str = str(amount)
-                    else:
-                        logger.warning(f"Valor invalido encontrado: '{amount_str}', usando 0.00")
-                        amount = 0.0
-                        amount_str = '0.00'
-                except ValueError:
-                    logger.warning(f"Nao foi possivel converter '{amount_str}' para float, usando 0.00")
-                    amount = 0.0
-                    amount_str = '0.00'
+                amt_match = _TRNAMT_RE.search(content, start, end)
+                amount_str = amt_match.group(1).strip() if amt_match else '0.00'
                 
                 # Extrair NAME e MEMO
-                name_match = re.search(r'<NAME>([^<]+)', entry)
+                name_match = _NAME_RE.search(content, start, end)
                 name = name_match.group(1).strip() if name_match else ''
                 
-                memo_match = re.search(r'<MEMO>([^<]+)', entry)
+                memo_match = _MEMO_RE.search(content, start, end)
                 memo = memo_match.group(1).strip() if memo_match else ''
                 
-                # Normalizar NAME e MEMO
-                if name:
-                    name = self.text_normalizer.normalize_utf8(name)
-                if memo:
-                    memo = self.text_normalizer.normalize_utf8(memo)
-                
-                # Combinar descricao
-                if name and memo:
-                    description = f"{name} - {memo}"
-                elif name:
-                    description = name
-                elif memo:
-                    description = memo
-                else:
-                    description = ''
-                
-                # Limpar descricao
-                description = self.text_normalizer.clean_memo(description)
-                
-                # Detectar transferências e categorizar
-                cat_info = self._categorize_ofx_transaction(description, amount)
-                
-                transactions.append({
-                    'date': formatted_date,
-                    'amount': amount_str,
-                    'description': description,
-                    'type': cat_info['type'],
-                    'category': cat_info['category'],
-                    'subcategory': cat_info['subcategory'],
-                    'qif_category': cat_info['qif_category']
-                })
+                transactions.append(
+                    self._build_transaction(formatted_date, amount_str, name, memo)
+                )
+            
+            if not found_entries:
+                logger.warning("Nenhuma transacao encontrada")
+                return None
             
             logger.info(f"Parse regex concluido: {len(transactions)} transacoes")
             return transactions
@@ -192,6 +225,96 @@ class OFXParser:
             logger.error(f"Erro no parse regex: {e}")
             return None
     
+    def count_declared_transactions(self, content) -> int:
+        """
+        Conta as tags <STMTTRN> do arquivo (limite superior de transações válidas)
+        
+        Args:
+            content: Conteúdo do OFX como bytes ou mmap
+            
+        Returns:
+            Quantidade de blocos STMTTRN
+        """
+        return sum(1 for _ in _STMTTRN_OPEN_BYTES_RE.finditer(content))
+    
+    def _normalize_amount(self, amount_str: str) -> str:
+        """
+        Remove separadores de milhar, espaços e '+' do TRNAMT
+        
+        Mesmas regras do toDecimal do ofxparse, para que lxml e regex
+        aceitem "1.000,50", "10,000.50", "1 025,53" e "+1058,53".
+        
+        Args:
+            amount_str: Valor como veio no TRNAMT
+            
+        Returns:
+            Valor com ponto como separador decimal
+        """
+        if _DOT_BEFORE_COMMA_RE.search(amount_str):
+            amount_str = amount_str.replace('.', '')
+        if _COMMA_BEFORE_DOT_RE.search(amount_str):
+            amount_str = amount_str.replace(',', '')
+        if '.' not in amount_str and ',' in amount_str:
+            amount_str = amount_str.replace(',', '.')
+        return amount_str.replace(' ', '').replace('+', '')
+    
+    def _build_transaction(self, formatted_date: str, amount_str: str, name: str, memo: str) -> Transaction:
+        """
+        Monta a transação a partir dos campos extraídos do OFX
+        
+        Args:
+            formatted_date: Data já no formato YYYY-MM-DD HH:MM:SS
+            amount_str: Valor como veio no TRNAMT (ver _normalize_amount)
+            name: Conteúdo de NAME (sem normalização)
+            memo: Conteúdo de MEMO (sem normalização)
+            
+        Returns:
+            Transaction com categorização
+        """
+        # Validar e sanitizar amount
+        amount_str = self._normalize_amount(amount_str)
+        try:
+            # Verificar se é um valor válido (não apenas '-' ou '.')
+            if amount_str and amount_str not in ['-', '.', '-.']:
+                # Decimal preserva as casas do TRNAMT ("-150.00", não "-150.0"),
+                # como o ofxparse fazia
+                amount_decimal = Decimal(amount_str)
+                amount = float(amount_decimal)
+                amount_str = str(amount_decimal)
+            else:
+                logger.warning(f"Valor invalido encontrado: '{amount_str}', usando 0.00")
+                amount = 0.0
+                amount_str = '0.00'
+        except (ValueError, InvalidOperation):
+            logger.warning(f"Nao foi possivel converter '{amount_str}' para float, usando 0.00")
+            amount = 0.0
+            amount_str = '0.00'
+        
+        # Normalizar NAME e MEMO
+        if name:
+            name = self.text_normalizer.normalize_utf8(name)
+        if memo:
+            memo = self.text_normalizer.normalize_utf8(memo)
+        
+        # Combinar descricao ("NAME - MEMO", ou so o campo preenchido)
+        description = ' - '.join(filter(None, (name, memo)))
+        
+        # Limpar descricao
+        description = self.text_normalizer.clean_memo(description)
+        
+        # Detectar transferências e categorizar
+        cat_info = self._categorize_ofx_transaction(description, amount)
+        
+        return Transaction(
+            date=formatted_date,
+            amount=amount_str,
+            description=description,
+            type=cat_info['type'],
+            category=cat_info['category'],
+            subcategory=cat_info['subcategory'],
+            qif_category=cat_info['qif_category']
+        )
+    
     def _categorize_ofx_transaction(self, description: str, amount: float) -> dict:
         """
         Categoriza transação OFX usando categorize_smart do categorizer
@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 class QIFWriter:
     """Escreve arquivos QIF formatados"""
     
+    # Buffer de escrita: um extrato inteiro cabe em poucas chamadas write()
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self):
         self.file_handle = None
     
@@ -28,14 +31,33 @@ class QIFWriter:
         Returns:
             File handle aberto para escrita
         """
-        self.file_handle = open(output_path, 'w', encoding='utf-8')
+        self.file_handle = open(output_path, 'w', encoding='utf-8', buffering=self.BUFFER_SIZE)
         self.file_handle.write('!Type:Bank\n')
         return self.file_handle
     
+    @staticmethod
+    def format_transaction(date: str, amount: str, description: str, category: str) -> str:
+        """
+        Formata uma transação como bloco QIF
+        
+        Args:
+            date: Data (YYYY-MM-DD)
+            amount: Valor
+            description: Descrição
+            category: Categoria
+            
+        Returns:
+            Bloco QIF terminado em '^'
+        """
+        return f'D{date}\nT{amount}\nP{description}\nL{category}\n^\n'
+    
     def write_transaction(self, date: str, amount: str, description: str, category: str):
         """
         Escreve uma transação no QIF
         
+        Uma chamada por transação, acumulada no buffer do arquivo, para o
+        QIF ser escrito na mesma passada que o CSV.
+        
         Args:
             date: Data (YYYY-MM-DD)
             amount: Valor
@@ -45,11 +67,7 @@ class QIFWriter:
         if not self.file_handle:
             raise ValueError("QIF file not created. Call create_qif_file() first.")
         
-        self.file_handle.write(f'D{date}\n')
-        self.file_handle.write(f'T{amount}\n')
-        self.file_handle.write(f'P{description}\n')
-        self.file_handle.write(f'L{category}\n')
-        self.file_handle.write('^\n')
+        self.file_handle.write(self.format_transaction(date, amount, description, category))
     
     def close(self):
         """Fecha arquivo e ajusta permissões"""
@@ -7,10 +7,11 @@ Formato: Movimentação | Liquidação | Lançamento | Qtd | Valor (R$) | Saldo
 
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-import openpyxl
+from typing import List, Optional
 from services.text_normalizer import TextNormalizer
 from services.categorizer import TransactionCategorizer
+from services.transaction import Transaction
+from services.br_format import BR_AMOUNT_TABLE
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ class RicoInvestimentoParser:
         self.text_normalizer = TextNormalizer()
         self.categorizer = categorizer
     
-    def parse(self, file_path: str) -> List[Dict[str, Any]]:
+    def parse(self, file_path: str) -> List[Transaction]:
         """
         Faz parse de arquivo XLSX de investimentos da Rico
         
@@ -35,49 +36,66 @@ class RicoInvestimentoParser:
         transactions = []
         
         try:
-            wb = openpyxl.load_workbook(file_path)
-            ws = wb.active
+            # Import tardio: openpyxl (e o lxml que ele carrega) só entra na
+            # memória quando chega o primeiro XLSX
+            import openpyxl
             
-            # Encontrar linha do header (procurar por "Movimentação" em qualquer coluna)
-            header_row = None
-            for row_num in range(1, min(30, ws.max_row + 1)):
-                for col_num in range(1, 10):  # Verificar primeiras 10 colunas
-                    cell_value = ws.cell(row=row_num, column=col_num).value
-                    if cell_value and 'Movimentação' in str(cell_value):
-                        header_row = row_num
-                        logger.info(f"Header encontrado na linha {header_row}, coluna {col_num}")
+            # read_only: as linhas são lidas em streaming do XML da planilha,
+            # sem montar o grid inteiro de células em memória
+            wb = openpyxl.load_workbook(file_path, read_only=True)
+            try:
+                ws = wb.active
+                # Alguns exportadores gravam a dimensão da planilha errada;
+                # sem ela o iter_rows lê até a última linha com dados
+                ws.reset_dimensions()
+                
+                # Colunas A..I: cobrem a busca do header e as colunas de dados
+                rows = ws.iter_rows(min_col=1, max_col=9, values_only=True)
+                
+                # Encontrar linha do header (procurar por "Movimentação" em qualquer coluna)
+                header_row = None
+                for row_num, row in enumerate(rows, start=1):
+                    if row_num >= 30:
                         break
-                if header_row:
-                    break
-            
-            if not header_row:
-                logger.error(f"Header 'Movimentação' não encontrado no XLSX: {file_path}")
-                return []
-            
-            # Processar linhas de dados (após header)
-            for row_num in range(header_row + 1, ws.max_row + 1):
-                try:
-                    # Ler células da linha (Excel offset: col A=1 está vazia, dados começam em B=2)
-                    liquidacao = ws.cell(row=row_num, column=3).value  # Col C - Data liquidação
-                    lancamento = ws.cell(row=row_num, column=4).value  # Col D - Descrição
-                    # Coluna 5 (E) = quantidade (informativo, ignorar)
-                    valor = ws.cell(row=row_num, column=6).value       # Col F - Valor R$
-                    # Coluna 7 (G) = saldo (ignorar)
-                    
-                    # Pular linhas vazias
-                    if not liquidacao or not lancamento:
-                        continue
-                    
-                    transaction = self._parse_transaction(
-                        liquidacao, lancamento, valor
-                    )
-                    
-                    if transaction:
-                        transactions.append(transaction)
+                    for col_num, cell_value in enumerate(row, start=1):
+                        if cell_value and 'Movimentação' in str(cell_value):
+                            header_row = row_num
+                            logger.info(f"Header encontrado na linha {header_row}, coluna {col_num}")
+                            break
+                    if header_row:
+                        break
+                
+                if not header_row:
+                    logger.error(f"Header 'Movimentação' não encontrado no XLSX: {file_path}")
+                    return []
+                
+                # Processar linhas de dados (o gerador continua logo após o header)
+                for row_num, row in enumerate(rows, start=header_row + 1):
+                    try:
+                        # Células da linha (Excel offset: col A=1 está vazia, dados começam em B=2)
+                        liquidacao = row[2]  # Col C - Data liquidação
+                        lancamento = row[3]  # Col D - Descrição
+                        # Coluna 5 (E) = quantidade (informativo, ignorar)
+                        valor = row[5]       # Col F - Valor R$
+                        # Coluna 7 (G) = saldo (ignorar)
+                        
+                        # Pular linhas vazias
+                        if not liquidacao or not lancamento:
+                            continue
                         
-                except Exception as e:
-                    logger.warning(f"Erro ao parsear linha {row_num}: {e}")
-                    continue
+                        transaction = self._parse_transaction(
+                            liquidacao, lancamento, valor
+                        )
+                        
+                        if transaction:
+                            transactions.append(transaction)
+                            
+                    except Exception as e:
+                        logger.warning(f"Erro ao parsear linha {row_num}: {e}")
+                        continue
+            finally:
+                # Em read_only o workbook mantém o arquivo aberto até close()
+                wb.close()
             
             logger.info(f"Rico Investimento: {len(transactions)} transações parseadas de {file_path}")
             return transactions
@@ -87,7 +105,7 @@ class RicoInvestimentoParser:
             raise
     
     def _parse_transaction(self, liquidacao, lancamento: str, 
-                          valor) -> Optional[Dict[str, Any]]:
+                          valor) -> Optional[Transaction]:
         """
         Parseia uma transação de investimentos da Rico
         
@@ -109,15 +127,15 @@ class RicoInvestimentoParser:
             # Categorizar
             category_info = self.categorizer.categorize_smart(description, amount)
             
-            return {
-                'date': date_str,
-                'description': description,
-                'amount': amount,
-                'type': category_info['type'],
-                'category': category_info['category'],
-                'subcategory': category_info.get('subcategory', ''),
-                'qif_category': self._get_qif_category(category_info)
-            }
+            return Transaction(
+                date=date_str,
+                description=description,
+                amount=amount,
+                type=category_info['type'],
+                category=category_info['category'],
+                subcategory=category_info.get('subcategory', ''),
+                qif_category=self._get_qif_category(category_info)
+            )
             
         except Exception as e:
             logger.error(f"Erro ao parsear transação: {e}")
@@ -158,17 +176,13 @@ class RicoInvestimentoParser:
                 return float(value)
             
             if isinstance(value, str):
-                # Remover "R$" e espaços
-                clean = value.replace('R$', '').strip()
+                # Remover "R$", espaços e pontos (milhares), trocar vírgula por ponto
+                clean = value.translate(BR_AMOUNT_TABLE)
                 
-                # Verificar sinal negativo
+                # Verificar sinal negativo ("-R$ 19,84" vira "-19.84")
                 is_negative = clean.startswith('-')
-                clean = clean.replace('-', '').strip()
-                
-                # Remover pontos (milhares) e trocar vírgula por ponto (decimais)
-                clean = clean.replace('.', '').replace(',', '.')
+                amount = float(clean[1:] if is_negative else clean)
                 
-                amount = float(clean)
                 return -amount if is_negative else amount
             
             return 0.0
@@ -8,21 +8,49 @@ Formato: Data;Descricao;Valor;Saldo
 import csv
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import List, Optional
 from services.text_normalizer import TextNormalizer
 from services.categorizer import TransactionCategorizer
+from services.transaction import Transaction
+from services.br_format import BR_AMOUNT_TABLE
 
 logger = logging.getLogger(__name__)
 
 
+def _fast_parse_rico_date(date_str: str) -> Optional[datetime]:
+    """
+    Parse direto do layout fixo "DD/MM/YY às HH:MM:SS"
+    
+    Fatia os campos e monta o datetime sem interpretar o formato a cada
+    linha como o strptime faz. O ano segue a regra do %y (69-99 -> 19xx).
+    
+    Args:
+        date_str: String de data da Rico
+        
+    Returns:
+        datetime ou None se a string não estiver no layout fixo
+    """
+    if (len(date_str) != 20 or date_str[8:12] != ' às '
+            or date_str[2] != '/' or date_str[5] != '/'
+            or date_str[14] != ':' or date_str[17] != ':'):
+        return None
+    year = int(date_str[6:8])
+    year += 2000 if year < 69 else 1900
+    return datetime(year, int(date_str[3:5]), int(date_str[0:2]),
+                    int(date_str[12:14]), int(date_str[15:17]), int(date_str[18:20]))
+
+
 class RicoParser:
     """Parser para extratos CSV da Rico"""
     
+    # Buffer de leitura (extratos são lidos inteiros em poucas chamadas read())
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, categorizer: TransactionCategorizer):
         self.text_normalizer = TextNormalizer()
         self.categorizer = categorizer
     
-    def parse(self, file_path: str) -> List[Dict[str, Any]]:
+    def parse(self, file_path: str) -> List[Transaction]:
         """
         Faz parse de arquivo CSV da Rico
         
@@ -35,20 +63,21 @@ class RicoParser:
         transactions = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8', buffering=self.BUFFER_SIZE) as f:
                 # Detecta se é arquivo Rico pelo header
                 first_line = f.readline().strip()
                 if not self._is_rico_format(first_line):
                     raise ValueError(f"Arquivo não está no formato Rico. Header: {first_line}")
                 
-                # Reset para início
-                f.seek(0)
-                
-                reader = csv.DictReader(f, delimiter=';')
+                # Colunas por posição (Data;Descricao;Valor;Saldo), sem dict por linha
+                reader = csv.reader(f, delimiter=';')
                 
                 for row in reader:
+                    if not row:
+                        continue
                     try:
-                        transaction = self._parse_transaction(row)
+                        data, descricao, valor, saldo = row[:4]
+                        transaction = self._parse_transaction(data, descricao, valor, saldo)
                         transactions.append(transaction)
                     except Exception as e:
                         logger.warning(f"Erro ao parsear linha Rico: {e}. Linha: {row}")
@@ -67,39 +96,39 @@ class RicoParser:
         header_fields = [f.strip() for f in header.split(';')]
         return header_fields == expected_fields
     
-    def _parse_transaction(self, row: Dict[str, str]) -> Dict[str, Any]:
+    def _parse_transaction(self, data: str, descricao: str, valor: str, saldo: str) -> Transaction:
         """
         Parseia uma transação da Rico
         
-        Formato esperado:
+        Formato esperado (colunas da linha):
         Data: "26/11/25 às 14:13:18"
         Descricao: "Pix enviado para Carine Pereira Santos"
         Valor: "-R$ 300,00" ou "R$ 1.000,00"
         Saldo: "R$ 612,32"
         """
         # Parse data
-        date_str = row['Data'].strip()
+        date_str = data.strip()
         date = self._parse_date(date_str)
         
         # Parse descrição
-        description = self.text_normalizer.normalize_utf8(row['Descricao'].strip())
+        description = self.text_normalizer.normalize_utf8(descricao.strip())
         
         # Parse valor
-        amount = self._parse_amount(row['Valor'].strip())
+        amount = self._parse_amount(valor.strip())
         
         # Categorizar
         category_info = self.categorizer.categorize_smart(description, amount)
         
-        return {
-            'date': date,
-            'description': description,
-            'amount': amount,
-            'type': category_info['type'],
-            'category': category_info['category'],
-            'subcategory': category_info.get('subcategory', ''),
-            'qif_category': self._get_qif_category(category_info),
-            'balance': self._parse_amount(row['Saldo'].strip())
-        }
+        return Transaction(
+            date=date,
+            description=description,
+            amount=amount,
+            type=category_info['type'],
+            category=category_info['category'],
+            subcategory=category_info.get('subcategory', ''),
+            qif_category=self._get_qif_category(category_info),
+            balance=self._parse_amount(saldo.strip())
+        )
     
     def _parse_date(self, date_str: str) -> str:
         """
@@ -112,14 +141,14 @@ class RicoParser:
             String no formato 'YYYY-MM-DD HH:MM:SS'
         """
         try:
-            # Remover " às " e parsear
-            date_part, time_part = date_str.split(' às ')
-            
-            # Parse DD/MM/YY HH:MM:SS
-            dt = datetime.strptime(f"{date_part} {time_part}", "%d/%m/%y %H:%M:%S")
+            dt = _fast_parse_rico_date(date_str)
+            if dt is None:
+                # Fora do layout fixo (ex.: dia com um dígito): strptime
+                date_part, time_part = date_str.split(' às ')
+                dt = datetime.strptime(f"{date_part} {time_part}", "%d/%m/%y %H:%M:%S")
             
             # Retornar como string YYYY-MM-DD HH:MM:SS
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+            return dt.isoformat(' ')
             
         except Exception as e:
             logger.error(f"Erro ao parsear data Rico '{date_str}': {e}")
@@ -137,17 +166,12 @@ class RicoParser:
             Float com valor
         """
         try:
-            # Remover "R$", espaços, e trocar separadores
-            clean = value_str.replace('R$', '').strip()
+            # Remover "R$", espaços e pontos (milhares), trocar vírgula por ponto
+            clean = value_str.translate(BR_AMOUNT_TABLE)
             
-            # Verificar sinal negativo
+            # Verificar sinal negativo ("-R$ 300,00" vira "-300.00")
             is_negative = clean.startswith('-')
-            clean = clean.replace('-', '').strip()
-            
-            # Remover pontos (milhares) e trocar vírgula por ponto (decimais)
-            clean = clean.replace('.', '').replace(',', '.')
-            
-            amount = float(clean)
+            amount = float(clean[1:] if is_negative else clean)
             
             return -amount if is_negative else amount
             
@@ -6,6 +6,26 @@ Responsável por normalização de texto e remoção de acentos
 """
 
 import unicodedata
+from functools import lru_cache
+from typing import List
+
+
+@lru_cache(maxsize=4096)
+def _strip_accents(text: str) -> str:
+    """
+    Remove acentos via NFD (ver TextNormalizer.normalize_utf8)
+    
+    Em cache por processo: descrições de extratos (lojas, Pix, tarifas) se
+    repetem entre transações e entre arquivos.
+    """
+    # Normalizar NFD (separa caractere base de acento)
+    normalized = unicodedata.normalize('NFD', text)
+    
+    # Remover caracteres de categoria Mn (marcas não-espacejadas = acentos)
+    return ''.join(
+        char for char in normalized 
+        if unicodedata.category(char) != 'Mn'
+    )
 
 
 class TextNormalizer:
@@ -30,16 +50,47 @@ class TextNormalizer:
         if not text:
             return text
         
-        # Normalizar NFD (separa caractere base de acento)
-        normalized = unicodedata.normalize('NFD', text)
+        # ASCII puro não tem acento a remover (NFD não o altera)
+        if text.isascii():
+            return text
+        
+        return _strip_accents(text)
+    
+    def normalize_batch(self, texts: List[str]) -> List[str]:
+        """
+        Remove acentos de uma lista de textos
+        
+        Extratos repetem muito as mesmas descrições (Pix, tarifas, lojas),
+        então cada texto distinto é normalizado uma única vez por lote.
+        """
+        normalized_by_text = {}
+        result = []
+        
+        for text in texts:
+            normalized = normalized_by_text.get(text)
+            if normalized is None:
+                normalized = normalized_by_text[text] = self.normalize_utf8(text)
+            result.append(normalized)
+        
+        return result
+    
+    def clean_batch(self, texts: List[str]) -> List[str]:
+        """
+        Remove acentos e palavras problemáticas de uma lista de textos
+        
+        Equivale a normalize_utf8 + clean_memo em cada texto, mas cada
+        texto distinto do lote passa pelas substituições uma única vez.
+        """
+        cleaned_by_text = {}
+        result = []
         
-        # Remover caracteres de categoria Mn (marcas não-espacejadas = acentos)
-        without_accents = ''.join(
-            char for char in normalized 
-            if unicodedata.category(char) != 'Mn'
-        )
+        for text in texts:
+            cleaned = cleaned_by_text.get(text)
+            if cleaned is None:
+                cleaned = cleaned_by_text[text] = self.clean_memo(self.normalize_utf8(text))
+            result.append(cleaned)
         
-        return without_accents
+        return result
     
     def clean_memo(self, memo: str) -> str:
         """Remove palavras problematicas (memo ja deve estar normalizado)"""
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transaction
+Registro de transação compartilhado por parsers e writers
+"""
+
+from typing import NamedTuple, Optional, Union
+
+
+class Transaction(NamedTuple):
+    """
+    Transação normalizada produzida pelos parsers
+
+    NamedTuple em vez de dict: sem tabela hash por linha e acesso por
+    atributo (txn.date) em extratos com milhares de transações.
+    """
+    date: str
+    amount: Union[str, float]
+    description: str
+    type: str
+    category: str
+    subcategory: str = ''
+    qif_category: str = ''
+    balance: Optional[float] = None
+    portador: str = ''  # Fatura de cartão: nome do portador
@@ -8,9 +8,11 @@ Formato: Data;Estabelecimento;Portador;Valor;Parcela
 import csv
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import List
 from services.text_normalizer import TextNormalizer
 from services.categorizer import TransactionCategorizer
+from services.transaction import Transaction
+from services.br_format import BR_AMOUNT_TABLE
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +20,14 @@ logger = logging.getLogger(__name__)
 class XPCartaoParser:
     """Parser para extratos CSV de cartão de crédito da XP"""
     
+    # Buffer de leitura (faturas são lidas inteiras em poucas chamadas read())
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, categorizer: TransactionCategorizer):
         self.text_normalizer = TextNormalizer()
         self.categorizer = categorizer
     
-    def parse(self, file_path: str) -> List[Dict[str, Any]]:
+    def parse(self, file_path: str) -> List[Transaction]:
         """
         Faz parse de arquivo CSV do cartão XP
         
@@ -35,12 +40,19 @@ class XPCartaoParser:
         transactions = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f, delimiter=';')
+            with open(file_path, 'r', encoding='utf-8', buffering=self.BUFFER_SIZE) as f:
+                # Colunas por posição (Data;Estabelecimento;Portador;Valor;Parcela)
+                reader = csv.reader(f, delimiter=';')
+                next(reader, None)
                 
                 for row in reader:
+                    if not row:
+                        continue
                     try:
-                        transaction = self._parse_transaction(row)
+                        data, estabelecimento, portador, valor, parcela = row[:5]
+                        transaction = self._parse_transaction(
+                            data, estabelecimento, portador, valor, parcela
+                        )
                         if transaction:
                             transactions.append(transaction)
                     except Exception as e:
@@ -54,11 +66,12 @@ class XPCartaoParser:
             logger.error(f"Erro ao processar arquivo XP {file_path}: {e}")
             raise
     
-    def _parse_transaction(self, row: Dict[str, str]) -> Dict[str, Any]:
+    def _parse_transaction(self, data: str, estabelecimento: str, portador: str,
+                           valor: str, parcela: str) -> Transaction:
         """
         Parseia uma transação do cartão XP
         
-        Formato esperado:
+        Formato esperado (colunas da linha):
         Data: "03/07/2025"
         Estabelecimento: "MOVEIS VALVERDE"
         Portador: "CARINE PEREIRA"
@@ -66,12 +79,12 @@ class XPCartaoParser:
         Parcela: "5 de 6" ou "-"
         """
         # Parse data
-        date_str = self._parse_date(row['Data'].strip())
+        date_str = self._parse_date(data.strip())
         
         # Parse descrição (Estabelecimento + Portador se relevante)
-        estabelecimento = row['Estabelecimento'].strip()
-        portador = row['Portador'].strip()
-        parcela = row['Parcela'].strip()
+        estabelecimento = estabelecimento.strip()
+        portador = portador.strip()
+        parcela = parcela.strip()
         
         # Montar descrição
         description = estabelecimento
@@ -82,21 +95,21 @@ class XPCartaoParser:
         description = self.text_normalizer.normalize_utf8(description)
         
         # Parse valor
-        amount = self._parse_amount(row['Valor'].strip())
+        amount = self._parse_amount(valor.strip())
         
         # Categorizar
         category_info = self.categorizer.categorize_smart(description, amount)
         
-        return {
-            'date': date_str,
-            'description': description,
-            'amount': amount,
-            'type': category_info['type'],
-            'category': category_info['category'],
-            'subcategory': category_info.get('subcategory', ''),
-            'qif_category': self._get_qif_category(category_info),
-            'portador': portador  # Info adicional
-        }
+        return Transaction(
+            date=date_str,
+            description=description,
+            amount=amount,
+            type=category_info['type'],
+            category=category_info['category'],
+            subcategory=category_info.get('subcategory', ''),
+            qif_category=self._get_qif_category(category_info),
+            portador=portador  # Info adicional
+        )
     
     def _parse_date(self, date_str: str) -> str:
         """
@@ -126,17 +139,12 @@ class XPCartaoParser:
             Float com valor
         """
         try:
-            # Remover "R$" e espaços
-            clean = value_str.replace('R$', '').strip()
+            # Remover "R$", espaços e pontos (milhares), trocar vírgula por ponto
+            clean = value_str.translate(BR_AMOUNT_TABLE)
             
             # Verificar sinal negativo
             is_negative = clean.startswith('-')
-            clean = clean.replace('-', '').strip()
-            
-            # Remover pontos (milhares) e trocar vírgula por ponto (decimais)
-            clean = clean.replace('.', '').replace(',', '.')
-            
-            amount = float(clean)
+            amount = float(clean[1:] if is_negative else clean)
             
             # XP: valores positivos = despesas, negativos = pagamentos
             # Inverter sinal para pagamentos ficarem positivos (income)
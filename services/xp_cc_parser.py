@@ -6,21 +6,31 @@ Responsável por parsear arquivos CSV de fatura de cartão de crédito do XP
 """
 
 import csv
-import re
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, NamedTuple, Optional
 from datetime import datetime
+from services.transaction import Transaction
+from services.br_format import BR_AMOUNT_TABLE, fast_convert_date
 
 logger = logging.getLogger(__name__)
 
 
+class XPCCParseResult(NamedTuple):
+    """Resultado de XPCCParser.parse (arquivo lido uma única vez)"""
+    transactions: List[Transaction]
+    first_date_for_filename: Optional[str]  # DD-MM-YYYY da primeira transação
+
+
 class XPCCParser:
     """Parser de arquivos CSV de fatura XP Credit Card"""
     
     # Identificador único do CSV do XP CC
     EXPECTED_HEADER = "Data;Estabelecimento;Portador;Valor;Parcela"
     
+    # Buffer de leitura (faturas são lidas inteiras em poucas chamadas read())
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, text_normalizer, categorizer, date_extractor):
         """
         Inicializa o parser com dependências
@@ -34,90 +44,108 @@ class XPCCParser:
         self.categorizer = categorizer
         self.date_extractor = date_extractor
     
-    @staticmethod
-    def is_xp_cc_csv(file_path: Path) -> bool:
+    def parse(self, file_path: Path) -> Optional[XPCCParseResult]:
         """
-        Verifica se o arquivo é um CSV de fatura do XP CC
+        Detecta, parseia e extrai a data do CSV de fatura XP CC em uma passada
+        
+        Confere o cabeçalho, parseia as linhas e guarda a data da primeira
+        transação abrindo o arquivo uma única vez.
         
         Args:
             file_path: Path do arquivo CSV
             
         Returns:
-            True se for CSV de fatura do XP CC
+            XPCCParseResult (transações podem vir vazias) ou None se o
+            arquivo não for um CSV do XP CC
         """
         try:
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                # Primeira linha deve conter o cabeçalho
-                # utf-8-sig automaticamente remove BOM se presente
-                header = f.readline().strip()
-                return header == XPCCParser.EXPECTED_HEADER
-        except Exception as e:
-            logger.debug(f"Erro ao verificar CSV XP CC: {e}")
-            return False
-    
-    def parse_csv(self, file_path: Path) -> Optional[List[Dict]]:
-        """
-        Parse do arquivo CSV de fatura XP CC
+            f = open(file_path, 'r', encoding='utf-8-sig', buffering=self.BUFFER_SIZE)
+        except OSError as e:
+            logger.error(f"Erro ao abrir CSV XP CC: {e}")
+            return None
         
-        Args:
-            file_path: Path do arquivo CSV
+        with f:
+            try:
+                # Ler cabeçalho (utf-8-sig remove BOM automaticamente)
+                header = f.readline().strip()
+            except Exception as e:
+                logger.debug(f"Erro ao verificar CSV XP CC: {e}")
+                return None
+            
+            if header != self.EXPECTED_HEADER:
+                return None
             
-        Returns:
-            Lista de transações ou None se falhar
-        """
-        try:
             transactions = []
+            first_date = None
             
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                # Ler cabeçalho (utf-8-sig remove BOM automaticamente)
-                header = f.readline().strip()
-                if header != self.EXPECTED_HEADER:
-                    logger.error(f"Cabeçalho CSV inválido: {header}")
-                    return None
+            try:
+                # Processar transações por posição; linhas curtas são
+                # completadas com None e descartadas em _parse_transaction
+                columns = len(self.EXPECTED_HEADER.split(';'))
+                padding = [None] * columns
                 
-                # Processar transações
-                csv_reader = csv.DictReader(f, delimiter=';', fieldnames=[
-                    'Data', 'Estabelecimento', 'Portador', 'Valor', 'Parcela'
-                ])
-                
-                for row in csv_reader:
+                for row in csv.reader(f, delimiter=';'):
                     # Pular linhas vazias
-                    if not row.get('Data') or not row['Data'].strip():
+                    if not row or not row[0].strip():
                         continue
                     
-                    transaction = self._parse_transaction(row)
+                    if first_date is None:
+                        # Converter DD/MM/YYYY para DD-MM-YYYY
+                        first_date = row[0].strip().replace('/', '-')
+                    
+                    transaction = self._parse_transaction(*(row + padding)[:columns])
                     if transaction:
                         transactions.append(transaction)
+            except Exception as e:
+                logger.error(f"Erro no parse CSV XP CC: {e}")
+                return XPCCParseResult([], first_date)
+        
+        logger.info(f"Parse XP CC concluído: {len(transactions)} transações")
+        return XPCCParseResult(transactions, first_date)
+    
+    def parse_csv(self, file_path: Path) -> Optional[List[Transaction]]:
+        """
+        Parse do arquivo CSV de fatura XP CC
+        
+        Args:
+            file_path: Path do arquivo CSV
             
-            logger.info(f"Parse XP CC concluído: {len(transactions)} transações")
-            return transactions if transactions else None
-            
-        except Exception as e:
-            logger.error(f"Erro no parse CSV XP CC: {e}")
+        Returns:
+            Lista de transações ou None se falhar
+        """
+        result = self.parse(file_path)
+        if result is None:
+            logger.error(f"Cabeçalho CSV inválido: {file_path.name}")
             return None
+        return result.transactions or None
     
-    def _parse_transaction(self, row: Dict[str, str]) -> Optional[Dict]:
+    def _parse_transaction(self, data: str, estabelecimento: str, portador: str,
+                           valor: str, parcela: str) -> Optional[Transaction]:
         """
         Processa uma linha de transação do CSV
         
         Args:
-            row: Dicionário com dados da linha
+            data: Coluna Data (DD/MM/YYYY)
+            estabelecimento: Coluna Estabelecimento
+            portador: Coluna Portador
+            valor: Coluna Valor (formato BR)
+            parcela: Coluna Parcela
             
         Returns:
-            Dicionário com transação formatada ou None se inválida
+            Transaction formatada ou None se inválida
         """
         try:
             # Extrair e converter data (DD/MM/YYYY -> YYYY-MM-DD)
-            date_str = row['Data'].strip()
+            date_str = data.strip()
             date = self._convert_date(date_str)
             if not date:
                 logger.warning(f"Data inválida: {date_str}")
                 return None
             
             # Extrair estabelecimento e portador
-            estabelecimento = row['Estabelecimento'].strip()
-            portador = row['Portador'].strip()
-            parcela_info = row['Parcela'].strip()
+            estabelecimento = estabelecimento.strip()
+            portador = portador.strip()
+            parcela_info = parcela.strip()
             
             if not estabelecimento:
                 logger.warning("Estabelecimento vazio, pulando transação")
@@ -131,21 +159,21 @@ class XPCCParser:
             description = self.text_normalizer.clean_memo(description)
             
             # Extrair e converter valor (formato BR: R$ 1.000,00 -> US: 1000.00)
-            amount_str = row['Valor'].strip()
+            amount_str = valor.strip()
             amount = self._convert_amount(amount_str)
             
             # Determinar categoria
             cat_info = self._categorize_transaction(description, amount)
             
-            return {
-                'date': date,
-                'amount': str(amount),
-                'description': description,
-                'type': cat_info['type'],
-                'category': cat_info['category'],
-                'subcategory': cat_info['subcategory'],
-                'qif_category': cat_info['qif_category']
-            }
+            return Transaction(
+                date=date,
+                amount=str(amount),
+                description=description,
+                type=cat_info['type'],
+                category=cat_info['category'],
+                subcategory=cat_info['subcategory'],
+                qif_category=cat_info['qif_category']
+            )
             
         except Exception as e:
             logger.error(f"Erro ao processar transação: {e}")
@@ -164,20 +192,15 @@ class XPCCParser:
             String formatada da descrição
         """
         # Começar com portador e estabelecimento
-        if portador:
-            description = f"{portador} - {estabelecimento}"
-        else:
-            description = estabelecimento
+        description = f"{portador} - {estabelecimento}" if portador else estabelecimento
         
-        # Adicionar informação de parcela se existir e não for "-" ou vazio
-        if parcela_info and parcela_info != '-' and parcela_info.strip():
-            # Limpar " de 1" (parcela única não precisa ser mostrada)
-            if parcela_info.strip() != 'de 1' and not parcela_info.strip().endswith('de 1'):
-                # Converter "5 de 6" para "(parcela 5/6)"
-                parcela_clean = parcela_info.replace(' de ', '/')
-                description += f" (parcela {parcela_clean})"
+        # Sem parcela ("-" ou vazio) ou parcela única ("de 1"): nada a mostrar
+        parcela = parcela_info.strip()
+        if not parcela or parcela == '-' or parcela.endswith('de 1'):
+            return description
         
-        return description
+        # Converter "5 de 6" para "(parcela 5/6)"
+        return f"{description} (parcela {parcela.replace(' de ', '/')})"
     
     def _convert_date(self, date_str: str) -> Optional[str]:
         """
@@ -190,7 +213,12 @@ class XPCCParser:
             Data no formato YYYY-MM-DD HH:MM:SS ou None se inválida
         """
         try:
-            # Parse DD/MM/YYYY
+            # Layout fixo: só reordena os campos
+            converted = fast_convert_date(date_str)
+            if converted is not None:
+                return converted
+            
+            # Parse DD/MM/YYYY (ex.: dia/mês com um dígito)
             dt = datetime.strptime(date_str, '%d/%m/%Y')
             # Retornar YYYY-MM-DD HH:MM:SS (com horário padrão 00:00:00)
             return dt.strftime('%Y-%m-%d 00:00:00')
@@ -208,18 +236,12 @@ class XPCCParser:
             Valor como float
         """
         try:
-            # Remover "R$" e espaços
-            clean = amount_str.replace('R$', '').strip()
+            # Remover "R$", espaços e pontos de milhar, trocar vírgula por ponto
+            clean = amount_str.translate(BR_AMOUNT_TABLE)
             
             # Verificar sinal negativo
             is_negative = clean.startswith('-')
-            if is_negative:
-                clean = clean.replace('-', '').strip()
-            
-            # Remover pontos de milhar e trocar vírgula por ponto
-            clean = clean.replace('.', '').replace(',', '.')
-            
-            amount = float(clean)
+            amount = float(clean[1:] if is_negative else clean)
             
             return -amount if is_negative else amount
             
@@ -243,15 +265,14 @@ class XPCCParser:
         # Se valor for negativo, é estorno ou pagamento de fatura (Income)
         if amount < 0:
             # Buscar nas regras de receita do categorizer
-            for rule in self.categorizer.income_rules:
-                keywords = [str(k).lower() for k in rule['keywords']]
-                if any(keyword in description_lower for keyword in keywords):
-                    return {
-                        'type': 'income',
-                        'category': rule['category'],
-                        'subcategory': rule.get('subcategory', ''),
-                        'qif_category': rule['category']
-                    }
+            rule = self.categorizer.find_rule('income', description_lower)
+            if rule:
+                return {
+                    'type': 'income',
+                    'category': rule['category'],
+                    'subcategory': rule.get('subcategory', ''),
+                    'qif_category': rule['category']
+                }
             
             # Fallback para estornos: Diversos > Reembolso
             return {
@@ -262,15 +283,14 @@ class XPCCParser:
             }
         
         # Para valores positivos (compras), buscar nas regras de despesa
-        for rule in self.categorizer.expense_rules:
-            keywords = [str(k).lower() for k in rule['keywords']]
-            if any(keyword in description_lower for keyword in keywords):
-                return {
-                    'type': 'expense',
-                    'category': rule['category'],
-                    'subcategory': rule.get('subcategory', ''),
-                    'qif_category': rule['category']
-                }
+        rule = self.categorizer.find_rule('expense', description_lower)
+        if rule:
+            return {
+                'type': 'expense',
+                'category': rule['category'],
+                'subcategory': rule.get('subcategory', ''),
+                'qif_category': rule['category']
+            }
         
         # Fallback: Diversos > Outras Despesas
         return {
@@ -279,35 +299,3 @@ class XPCCParser:
             'subcategory': 'Outras Despesas',
             'qif_category': 'Diversos'
         }
-    
-    def get_date_for_filename(self, file_path: Path) -> Optional[str]:
-        """
-        Extrai a data da primeira transação para usar no nome do arquivo
-        
-        Args:
-            file_path: Path do arquivo CSV
-            
-        Returns:
-            Data no formato DD-MM-YYYY ou None
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                # Pular cabeçalho (utf-8-sig remove BOM)
-                f.readline()
-                
-                # Ler primeira transação
-                csv_reader = csv.DictReader(f, delimiter=';', fieldnames=[
-                    'Data', 'Estabelecimento', 'Portador', 'Valor', 'Parcela'
-                ])
-                
-                for row in csv_reader:
-                    date_str = row.get('Data', '').strip()
-                    if date_str:
-                        # Converter DD/MM/YYYY para DD-MM-YYYY
-                        return date_str.replace('/', '-')
-                
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao extrair data do arquivo: {e}")
-            return None
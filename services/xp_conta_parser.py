@@ -6,14 +6,48 @@ Responsável por parsear arquivos CSV de extrato da conta digital XP
 """
 
 import csv
-import re
 import logging
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Optional
 from datetime import datetime
+from services.transaction import Transaction
 
 logger = logging.getLogger(__name__)
 
+# Valor BR -> formato do float() numa única passada: descarta "R$", espaços,
+# sinal e pontos de milhar e troca a vírgula decimal
+_BR_AMOUNT_TABLE = str.maketrans({
+    'R': None, '$': None, ' ': None, '\xa0': None, '-': None, '.': None, ',': '.'
+})
+
+# Layout fixo da coluna Data: "13/12/25 às 09:02:56"
+_DATE_RE = re.compile(r'(\d\d)/(\d\d)/(\d\d) às (\d\d):(\d\d):(\d\d)')
+_DATE_FORMAT = '%d/%m/%y %H:%M:%S'
+
+
+@lru_cache(maxsize=4096)
+def _format_xp_date(date_str: str) -> str:
+    """
+    Converte DD/MM/YY às HH:MM:SS para YYYY-MM-DD HH:MM:SS (ver _convert_date)
+    
+    Em cache: lotes de Pix repetem o mesmo timestamp em várias linhas.
+    Datas inválidas levantam ValueError (exceções não entram no cache).
+    """
+    match = _DATE_RE.fullmatch(date_str)
+    if match:
+        # Campos já separados: datetime só valida o calendário;
+        # ano com a regra do %y (69-99 -> 19xx)
+        day, month, year, hour, minute, second = map(int, match.groups())
+        year += 2000 if year < 69 else 1900
+        dt = datetime(year, month, day, hour, minute, second)
+    else:
+        # Fora do layout fixo: remover " às " e parsear DD/MM/YY HH:MM:SS
+        dt = datetime.strptime(date_str.replace(' às ', ' '), _DATE_FORMAT)
+    
+    return dt.isoformat(' ')
+
 
 class XPContaParser:
     """Parser de arquivos CSV de extrato da conta digital XP"""
@@ -21,6 +55,9 @@ class XPContaParser:
     # Identificador único do CSV da Conta XP
     EXPECTED_HEADER = "Data;Descricao;Valor;Saldo"
     
+    # Buffer de leitura (extratos são lidos inteiros em poucas chamadas read())
+    BUFFER_SIZE = 1 << 16
+    
     def __init__(self, text_normalizer, categorizer, date_extractor):
         """
         Inicializa o parser com dependências
@@ -34,26 +71,7 @@ class XPContaParser:
         self.categorizer = categorizer
         self.date_extractor = date_extractor
     
-    @staticmethod
-    def is_xp_conta_csv(file_path: Path) -> bool:
-        """
-        Verifica se o arquivo é um CSV de extrato da conta digital XP
-        
-        Args:
-            file_path: Path do arquivo CSV
-            
-        Returns:
-            True se for CSV de extrato da conta digital XP
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                header = f.readline().strip()
-                return header == XPContaParser.EXPECTED_HEADER
-        except Exception as e:
-            logger.debug(f"Erro ao verificar CSV XP Conta: {e}")
-            return False
-    
-    def parse_csv(self, file_path: Path) -> Optional[List[Dict]]:
+    def parse_csv(self, file_path: Path) -> Optional[List[Transaction]]:
         """
         Parse do arquivo CSV de extrato da conta digital XP
         
@@ -64,25 +82,36 @@ class XPContaParser:
             Lista de transações ou None se falhar
         """
         try:
-            transactions = []
-            
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
+            with open(file_path, 'r', encoding='utf-8-sig', buffering=self.BUFFER_SIZE) as f:
                 header = f.readline().strip()
                 if header != self.EXPECTED_HEADER:
                     logger.error(f"Cabeçalho CSV inválido: {header}")
                     return None
                 
-                csv_reader = csv.DictReader(f, delimiter=';', fieldnames=[
-                    'Data', 'Descricao', 'Valor', 'Saldo'
-                ])
-                
-                for row in csv_reader:
-                    if not row.get('Data') or not row['Data'].strip():
-                        continue
-                    
-                    transaction = self._parse_transaction(row)
-                    if transaction:
-                        transactions.append(transaction)
+                # Colunas por posição (Data;Descricao;Valor;Saldo); linhas
+                # curtas são completadas com None e descartadas em
+                # _parse_transaction. Saldo não é usado.
+                padding = [None] * 3
+                rows = [
+                    (row + padding)[:3] for row in csv.reader(f, delimiter=';')
+                    if row and row[0].strip()
+                ]
+            
+            # Normalizar descrições do arquivo inteiro: Pix, tarifas e lojas
+            # se repetem, então cada texto distinto é tratado uma vez
+            descriptions = self.text_normalizer.clean_batch([
+                (row[1] or '').strip() for row in rows
+            ])
+            
+            # Linhas já lidas: lista montada numa compreensão, sem append por linha
+            transactions = [
+                transaction
+                for transaction in (
+                    self._parse_transaction(data, description, valor)
+                    for (data, _, valor), description in zip(rows, descriptions)
+                )
+                if transaction
+            ]
             
             logger.info(f"Parse XP Conta concluído: {len(transactions)} transações")
             return transactions if transactions else None
@@ -91,49 +120,45 @@ class XPContaParser:
             logger.error(f"Erro no parse CSV XP Conta: {e}")
             return None
     
-    def _parse_transaction(self, row: Dict[str, str]) -> Optional[Dict]:
+    def _parse_transaction(self, data: str, description: str, valor: str) -> Optional[Transaction]:
         """
         Processa uma linha de transação do CSV
         
         Args:
-            row: Dicionário com dados da linha
+            data: Coluna Data (DD/MM/YY às HH:MM:SS)
+            description: Coluna Descricao já normalizada (clean_batch)
+            valor: Coluna Valor (formato BR)
             
         Returns:
-            Dicionário com transação formatada ou None se inválida
+            Transaction formatada ou None se inválida
         """
         try:
             # Extrair e converter data (DD/MM/YY às HH:MM:SS -> YYYY-MM-DD HH:MM:SS)
-            date_str = row['Data'].strip()
+            date_str = data.strip()
             date = self._convert_date(date_str)
             if not date:
                 logger.warning(f"Data inválida: {date_str}")
                 return None
             
-            # Extrair descrição
-            description = row['Descricao'].strip()
             if not description:
                 logger.warning("Descrição vazia, pulando transação")
                 return None
             
-            # Normalizar descrição
-            description = self.text_normalizer.normalize_utf8(description)
-            description = self.text_normalizer.clean_memo(description)
-            
             # Extrair e converter valor
-            amount_str = row['Valor'].strip()
+            amount_str = valor.strip()
             amount = self._convert_amount(amount_str)
             
             # Categorizar transação
             cat_info = self._categorize_transaction(description, amount)
             
-            return {
-                'date': date,
-                'amount': str(amount),
-                'description': description,
-                'type': cat_info['type'],
-                'category': cat_info['category'],
-                'subcategory': cat_info['subcategory']
-            }
+            return Transaction(
+                date=date,
+                amount=str(amount),
+                description=description,
+                type=cat_info['type'],
+                category=cat_info['category'],
+                subcategory=cat_info['subcategory']
+            )
             
         except Exception as e:
             logger.error(f"Erro ao processar transação: {e}")
@@ -151,13 +176,7 @@ class XPContaParser:
         """
         try:
             # Formato: "13/12/25 às 09:02:56"
-            # Remover " às " e substituir por espaço
-            clean_date = date_str.replace(' às ', ' ')
-            
-            # Parse DD/MM/YY HH:MM:SS
-            dt = datetime.strptime(clean_date, '%d/%m/%y %H:%M:%S')
-            
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
+            return _format_xp_date(date_str)
         except ValueError as e:
             logger.debug(f"Erro ao converter data '{date_str}': {e}")
             return None
@@ -173,17 +192,11 @@ class XPContaParser:
             Valor como float
         """
         try:
-            # Remover "R$" e espaços
-            clean = amount_str.replace('R$', '').strip()
-            
             # Verificar sinal negativo (pode estar antes ou depois do R$)
-            is_negative = '-' in clean
-            clean = clean.replace('-', '').strip()
-            
-            # Remover pontos de milhar e trocar vírgula por ponto
-            clean = clean.replace('.', '').replace(',', '.')
+            is_negative = '-' in amount_str
             
-            amount = float(clean)
+            # Remover "R$", sinal, espaços e pontos de milhar, trocar vírgula por ponto
+            amount = float(amount_str.translate(_BR_AMOUNT_TABLE))
             
             return -amount if is_negative else amount
             